@@ -0,0 +1,85 @@
+"""
+This file runs the AI's guesses on a background thread, so that the game
+can keep drawing while the AI thinks, and a guess can be ready before the
+user asks for it.
+"""
+import threading
+import time
+from minesweeperSolver import *
+
+class AIWorker:
+    """
+    This class owns a worker thread that finds the chance of each cell 
+    being a mine for the AI's next guess. The worker only gets a snapshot 
+    of what the chances need (see MinesweeperAI.getGuessSnapshot), so the 
+    game can keep changing the real AI meanwhile, and the guess is picked 
+    from the chances on the game's thread.
+    Every result is tagged with the AI it was computed for and the version
+    of the board it saw, and is only used for that same board (the AI has 
+    no __eq__, so AIs are compared by identity).
+    """
+    def __init__(self, timeBudget=None):
+        # seconds the worker can spend on a guess (None for no limit)
+        self.timeBudget = timeBudget
+        self.condition = threading.Condition()
+        # (AI, version, snapshot, sample budget) waiting to be computed
+        self.job = None
+        # (AI, version) of the last job submitted, and of the last result
+        self.submitted = None
+        self.resultKey = None
+        self.result = None
+        self.thread = None
+
+    def submit(self, AI, version):
+        """
+        This method asks the worker to find the chances for the next guess
+        of an AI at a given version of the board, replacing any job that 
+        has not started yet. Does nothing if that version was already 
+        submitted.
+        """
+        with self.condition:
+            if self.submitted == (AI, version):
+                return
+            self.submitted = (AI, version)
+            # take the snapshot now, so the worker never sees the AI change
+            self.job = (AI, version, AI.getGuessSnapshot(), AI.sampleBudget)
+            self.condition.notify()
+        if self.thread == None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def getMove(self, AI, version):
+        """
+        This method returns the AI's guess from the chances found for a 
+        given version of the board, or None if they are not ready (or were 
+        found for an older board).
+        """
+        with self.condition:
+            if self.resultKey != (AI, version):
+                return None
+            chances = self.result
+        if chances == None:
+            # no chances were found in time, use the quick guess
+            return AI.makeBestGuess(0)
+        return AI.useGuessChances(chances)
+
+    def run(self):
+        """
+        This method is the loop of the worker thread, which finds the 
+        chances of every job and publishes them unless a newer job came in.
+        """
+        while True:
+            with self.condition:
+                while self.job == None:
+                    self.condition.wait()
+                AI, version, snapshot, sampleBudget = self.job
+                self.job = None
+            deadline = None
+            if self.timeBudget != None:
+                deadline = time.perf_counter() + self.timeBudget
+            chances = getGuessChances(*snapshot, sampleBudget, deadline)
+            with self.condition:
+                # drop the chances if the board changed while finding them
+                if self.submitted == (AI, version):
+                    self.resultKey = (AI, version)
+                    self.result = chances
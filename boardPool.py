@@ -0,0 +1,92 @@
+"""
+This file generates boards that can be solved without guessing, and keeps a
+few of them ready in the background for every board size that is played.
+A board is stored as the seed of its mines and its first click, since the
+engine always builds the same board from those.
+"""
+import os
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from minesweeperEngine import *
+
+def isNoGuessBoard(rows, cols, mines, seed, firstCell):
+    """
+    This function plays a board with only the moves the AI knows are safe.
+    Returns True if that wins the game, so the board needs no guessing.
+    """
+    engine = MinesweeperEngine(rows, cols, mines, seed=seed)
+    engine.reveal(firstCell)
+    while not engine.gameOver and not engine.checkWin():
+        move = engine.AI.makeSafeMove()
+        if move == None:
+            return False
+        engine.reveal(move)
+    return engine.checkWin()
+
+def findNoGuessBoard(rows, cols, mines, seed, maxTries=1000):
+    """
+    This function tries random boards, first clicked in the middle, until
+    one can be solved without guessing.
+    The boards tried are chosen from the given seed, so the search can be
+    repeated.
+    Returns (seed, first cell) of the board, or None if none was found in
+    maxTries boards.
+    """
+    rng = random.Random(seed)
+    firstCell = (rows // 2, cols // 2)
+    for tries in range(maxTries):
+        boardSeed = rng.randrange(2 ** 32)
+        if isNoGuessBoard(rows, cols, mines, boardSeed, firstCell):
+            return boardSeed, firstCell
+    return None
+
+class BoardPool:
+    """
+    This class keeps a small queue of no-guess boards ready for every
+    (rows, cols, mines) size, generated by a background process pool.
+    Boards bigger than maxCells are never generated, since finding one
+    would take too long.
+    """
+    def __init__(self, boardsPerSize=3, maxCells=10000):
+        self.boardsPerSize = boardsPerSize
+        self.maxCells = maxCells
+        # ready boards and boards being generated for every size
+        self.readyBoards = dict()
+        self.pendingBoards = dict()
+        # the process pool is made the first time a board is generated
+        self.pool = None
+
+    def refill(self, rows, cols, mines):
+        """
+        This method collects the boards that finished generating for a
+        size, and starts generating more until the queue would be full.
+        """
+        size = (rows, cols, mines)
+        if rows * cols > self.maxCells:
+            return
+        ready = self.readyBoards.setdefault(size, deque())
+        pending = self.pendingBoards.setdefault(size, [])
+        for future in [future for future in pending if future.done()]:
+            pending.remove(future)
+            board = future.result()
+            if board != None:
+                ready.append(board)
+        if self.pool == None:
+            # leave a core for the game itself
+            self.pool = ProcessPoolExecutor(max(1, (os.cpu_count() or 1) - 1))
+        while len(ready) + len(pending) < self.boardsPerSize:
+            pending.append(self.pool.submit(findNoGuessBoard, rows, cols,
+                                            mines, random.randrange(2 ** 32)))
+
+    def getBoard(self, rows, cols, mines):
+        """
+        This method takes a ready board of the given size out of the queue,
+        and starts generating a new one in its place.
+        Returns (seed, first cell), or None if no board is ready.
+        """
+        self.refill(rows, cols, mines)
+        ready = self.readyBoards.get((rows, cols, mines))
+        board = ready.popleft() if ready else None
+        self.refill(rows, cols, mines)
+        return board
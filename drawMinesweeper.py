@@ -3,10 +3,73 @@ This file implements the gameplay for the Minesweeper game.
 Draws the game board and handles user actions. 
 """
 from cmu_graphics import *
-import random
-from PIL import Image
-from minesweeperAI import *
-import os, pathlib
+try:
+    # internals used by releaseStaleImages
+    from cmu_graphics import shape_logic
+except ImportError:
+    shape_logic = None
+from PIL import Image, ImageDraw, ImageFont
+from minesweeperEngine import *
+from endlessEngine import *
+import os, pathlib, hashlib
+
+# assets loaded so far, shared by every game in this process
+assetCache = dict()
+
+def getAsset(key, loader, *args):
+    """
+    This function returns the asset saved under key, calling loader(*args) 
+    to load it the first time it is asked for.
+    Every asset is only loaded once per process, and every game gets a 
+    reference to the same object.
+    """
+    if key not in assetCache:
+        assetCache[key] = loader(*args)
+    return assetCache[key]
+
+def loadImage(relativePath):
+    # read the whole image now, so that the file can be closed
+    with Image.open(relativePath) as image:
+        image.load()
+    return image
+
+def getImage(relativePath):
+    """
+    This function returns the PIL image of a file, loaded once per process.
+    """
+    return getAsset(('image', relativePath), loadImage, relativePath)
+
+def getCMUImage(relativePath):
+    """
+    This function returns the CMUImage of a file, made once per process.
+    """
+    return getAsset(('CMUImage', relativePath), CMUImage, 
+                    getImage(relativePath))
+
+# CMUImages that are no longer drawn, see releaseStaleImages
+staleImages = []
+
+def releaseStaleImages():
+    """
+    This function frees the decoded copies cmu_graphics keeps of the 
+    CMUImages that are no longer drawn.
+    cmu_graphics keeps a copy of every CMUImage it has drawn, under an id 
+    that is new for every CMUImage, and never frees them itself. Called at 
+    the start of a frame, when no shape of the last frame draws them.
+    Written against cmu_graphics 3.0.1, whose private activeDrawing.images 
+    holds the copies. With other versions that lack it, does nothing.
+    """
+    drawing = getattr(shape_logic, 'activeDrawing', None)
+    images = getattr(drawing, 'images', None)
+    hashReference = getattr(shape_logic, 'hashReference', None)
+    if isinstance(images, dict) and hashReference != None:
+        for image in staleImages:
+            try:
+                images.pop(hashReference(image), None)
+            except Exception:
+                # the internals changed, leave the copies alone
+                break
+    staleImages.clear()
 
 class soundPlay:
     """
@@ -28,6 +91,12 @@ class soundPlay:
     def play(self, restart=False):
         # play the sound
         self.sound.play(restart=restart)
+
+def getSound(relativePath):
+    """
+    This function returns the sound of a file, made once per process.
+    """
+    return getAsset(('sound', relativePath), soundPlay, relativePath)
     
 class Background:
     """
@@ -39,9 +108,8 @@ class Background:
     https://www.vecteezy.com/vector-art/2948764-pixel-background-the-concept-of-games-background
     """
     def __init__(self):
-        # open the image and save it in a class variable
-        self.background = Image.open('grass.jpeg')
-        self.background = CMUImage(self.background)
+        # get the shared image
+        self.background = getCMUImage('grass.jpeg')
     
     def draw(self, left, top, width, height):
         # draw the image
@@ -58,9 +126,9 @@ class Bomb:
     https://www.pngegg.com/en/png-cbukd
     """
     def __init__(self):
-        # open the image and save it in a class variable
-        self.bomb = Image.open('bomb.png')
-        self.bomb = CMUImage(self.bomb)
+        # get the shared image
+        self.image = getImage('bomb.png')
+        self.bomb = getCMUImage('bomb.png')
     
     def draw(self, left, top, width, height):
         # draw the image
@@ -70,34 +138,96 @@ class BombGif:
     """
     This class creates an exploding bomb that will be drawn on the board.
     Called as soon as the user clicks on a bomb.
+    The frames are only loaded the first time a bomb explodes, from a 
+    sprite sheet baked from the gif, and are shared by every BombGif.
     
     Citations: 
     1. Used the CMU Graphics Demo Folder Provided to Draw GIF's
     2. Got the gif for the bomb from this url.
     https://tenor.com/view/bomb-joypixels-bombing-explode-blast-gif-17542148
     """
-    def __init__(self):
-        # Load the gif
-        myGif = Image.open('bomb.gif')
-        self.spriteList = []
-        # seek all the frame of the gif and append
-        for frame in range(myGif.n_frames):
-            myGif.seek(frame)
-            fr = myGif.resize((myGif.size[0]//2, myGif.size[1]//2))
-            fr = fr.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
-            fr = CMUImage(fr)
-            self.spriteList.append(fr)
+    # folder of the baked sprite sheets (not kept in git)
+    sheetFolder = 'spriteCache'
 
-        # Fix for broken transparency on frame 0
-        self.spriteList.pop(0)
+    def __init__(self):
+        # the frames are loaded when the bomb first explodes
+        self.spriteList = None
         self.frameIndex = 0
         self.steps = 0
+
+    def getSprites(self):
+        # get the shared frames of the gif, loading them the first time
+        if self.spriteList == None:
+            self.spriteList = getAsset(('gif', 'bomb.gif'), self.loadSprites)
+        return self.spriteList
+
+    def getSheetPath(self):
+        """
+        This method returns the path of the sprite sheet of the gif, named 
+        after the hash of the gif and the size of its frames, so a changed 
+        gif is baked again.
+        """
+        with open('bomb.gif', 'rb') as gifFile:
+            gifHash = hashlib.sha256(gifFile.read()).hexdigest()[:16]
+        # only the header is read to get the size
+        with Image.open('bomb.gif') as myGif:
+            width, height = myGif.size[0]//2, myGif.size[1]//2
+        return os.path.join(self.sheetFolder, 
+                            f'bomb-{gifHash}-{width}x{height}.png')
+
+    def bakeSheet(self, sheetPath):
+        """
+        This method resizes and flips every frame of the gif, and saves 
+        them side by side in one sprite sheet.
+        Older sheets of the gif are deleted.
+        """
+        # Load the gif
+        frames = []
+        with Image.open('bomb.gif') as myGif:
+            # seek all the frame of the gif and append
+            for frame in range(myGif.n_frames):
+                myGif.seek(frame)
+                fr = myGif.resize((myGif.size[0]//2, myGif.size[1]//2))
+                fr = fr.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+                frames.append(fr.convert('RGBA'))
+        # Fix for broken transparency on frame 0
+        frames.pop(0)
+        width, height = frames[0].size
+        sheet = Image.new('RGBA', (width * len(frames), height))
+        for index, frame in enumerate(frames):
+            sheet.paste(frame, (index * width, 0))
+        os.makedirs(self.sheetFolder, exist_ok=True)
+        for fileName in os.listdir(self.sheetFolder):
+            if fileName.startswith('bomb-'):
+                os.remove(os.path.join(self.sheetFolder, fileName))
+        # write to a temporary file first, so a sheet is never half written
+        sheet.save(sheetPath + '.tmp', format='PNG')
+        os.replace(sheetPath + '.tmp', sheetPath)
+
+    def loadSprites(self):
+        """
+        This method loads the frames of the gif from its sprite sheet, 
+        baking the sheet first if the gif changed since it was last baked.
+        """
+        sheetPath = self.getSheetPath()
+        if not os.path.exists(sheetPath):
+            self.bakeSheet(sheetPath)
+        sheet = loadImage(sheetPath)
+        # the frame size is in the name of the sheet
+        width, height = map(int, sheetPath[:-len('.png')]
+                                 .split('-')[-1].split('x'))
+        return [CMUImage(sheet.crop((left, 0, left + width, height)))
+                for left in range(0, sheet.size[0], width)]
     
     def draw(self, left, top, width, height):
-        drawImage(self.spriteList[self.frameIndex],
+        drawImage(self.getSprites()[self.frameIndex],
                 left, top, width=width, height=height)
     
     def doStep(self):
+        # the animation only runs once draw has loaded the frames, so a 
+        # game that is won never loads them
+        if self.spriteList == None:
+            return
         self.steps += 1
         if self.steps % 3 == 0:
             self.frameIndex = (self.frameIndex + 1) % (len(self.spriteList))
@@ -113,68 +243,320 @@ class Flag:
     https://www.iconfinder.com/icons/3024770/flag_flags_marker_nation_icon
     """
     def __init__(self):
-        # open the image and save it in a class variable
-        self.flag = Image.open('flag.png')
-        self.flag = CMUImage(self.flag)
+        # get the shared image
+        self.image = getImage('flag.png')
+        self.flag = getCMUImage('flag.png')
     def draw(self, left, top, width, height):
         # draw the image
         drawImage(self.flag,left,top,width=width,height=height)
+
+class BoardTiles:
+    """
+    This class keeps the drawn board in cached bitmap tiles, so that only 
+    the cells that changed since the last frame are drawn again.
+    Each tile covers a square block of cells and is wrapped as a CMUImage 
+    only when one of its cells changes, so drawing the board takes one 
+    drawImage call per tile instead of several shapes per cell.
+    Replaced CMUImages are released, and only the last maxTiles tiles that 
+    were drawn are kept, so memory stays the same however long the game.
+    """
+    # approximate size of a tile in pixels
+    tilePixels = 256
+    # number of tiles kept, more than fit in the viewport at once
+    maxTiles = 36
+    # CMU Graphics color used for flooded cells
+    floodColor = (144, 238, 144, 255)
+
+    def __init__(self, rows, cols, cellWidth, cellHeight, borderWidth):
+        self.rows = rows
+        self.cols = cols
+        self.cellWidth = cellWidth
+        self.cellHeight = cellHeight
+        self.borderWidth = borderWidth
+        # number of cells along each side of a tile
+        self.tileCells = max(1, int(self.tilePixels // 
+                                    min(cellWidth, cellHeight)))
+        # maps (tileRow, tileCol) to the tile's PIL image and CMUImage
+        self.tiles = dict()
+        # tiles that have cells that need to be drawn again
+        self.changedTiles = dict()
+        self.font = None
+        self.resizedImages = dict()
+
+    def __getstate__(self):
+        # bitmaps are not saved, they are drawn again after loading
+        state = self.__dict__.copy()
+        state['tiles'] = dict()
+        state['changedTiles'] = dict()
+        state['font'] = None
+        state['resizedImages'] = dict()
+        return state
+
+    def getCellBox(self, cell):
+        """
+        This function returns the (left, top, right, bottom) pixels of a 
+        cell, relative to the top left of the board.
+        """
+        row, col = cell
+        return (int(col * self.cellWidth), int(row * self.cellHeight),
+                int((col + 1) * self.cellWidth), 
+                int((row + 1) * self.cellHeight))
+
+    def getTile(self, cell):
+        """
+        This function returns the (tileRow, tileCol) of the tile that 
+        contains a cell.
+        """
+        return (cell[0] // self.tileCells, cell[1] // self.tileCells)
+
+    def getTileCells(self, tile):
+        """
+        This function returns the first and last cell covered by a tile.
+        """
+        firstCell = (tile[0] * self.tileCells, tile[1] * self.tileCells)
+        lastCell = (min(self.rows, firstCell[0] + self.tileCells) - 1,
+                    min(self.cols, firstCell[1] + self.tileCells) - 1)
+        return firstCell, lastCell
+
+    def markChanged(self, cell):
+        """
+        This function marks a cell to be drawn again on the next frame.
+        """
+        tile = self.getTile(cell)
+        if tile in self.tiles:
+            self.changedTiles.setdefault(tile, set()).add(cell)
+
+    def getFont(self):
+        """
+        This function loads the font used to draw the counts.
+        """
+        if self.font == None:
+            # shrink the counts on small cells
+            size = max(6, min(25, int(0.8 * min(self.cellWidth, 
+                                                self.cellHeight))))
+            try:
+                self.font = ImageFont.truetype('DejaVuSans-Bold.ttf', size)
+            except OSError:
+                self.font = ImageFont.load_default(size)
+        return self.font
+
+    def getResizedImage(self, image, width, height):
+        """
+        This function returns an image resized to a cell, resizing each 
+        image only once.
+        """
+        key = (id(image), width, height)
+        if key not in self.resizedImages:
+            self.resizedImages[key] = (image.convert('RGBA')
+                                       .resize((width, height)))
+        return self.resizedImages[key]
+
+    def drawCell(self, tileImage, tileLeft, tileTop, cell, minesweeper):
+        """
+        This function draws a single cell into the bitmap of its tile, 
+        keeping track of any conditions the cell may be under 
+        (a flag, a bomb, or a count).
+        """
+        left, top, right, bottom = self.getCellBox(cell)
+        left, right = left - tileLeft, right - tileLeft
+        top, bottom = top - tileTop, bottom - tileTop
+        width, height = right - left, bottom - top
+        draw = ImageDraw.Draw(tileImage)
+        # draw the cell in corresponding color (clear cells let the 
+        # background show through)
+        fillColor = (0, 0, 0, 0)
+        if cell in minesweeper.floodedCells:
+            fillColor = self.floodColor
+        elif (minesweeper.explodedCell != None and 
+              cell in minesweeper.mines and 
+              cell not in minesweeper.clickedCells and 
+              cell not in minesweeper.flagCells):
+            # if a mine was clicked, draw all the other bombs in red
+            fillColor = 'red'
+        draw.rectangle((left, top, right - 1, bottom - 1), fill=fillColor)
+        if fillColor == 'red':
+            bombImage = self.getResizedImage(minesweeper.bomb.image, 
+                                             width, height)
+            tileImage.alpha_composite(bombImage, (left, top))
+        # draw the flag on the selected cell
+        elif cell in minesweeper.flagCells:
+            flagImage = self.getResizedImage(minesweeper.flagImage.image,
+                                             width, width)
+            tileImage.alpha_composite(flagImage.crop((0, 0, width, height)),
+                                      (left, top))
+        # otherwise, draw the count of nearest mines 
+        # (the clicked mine is drawn by the bomb gif)
+        elif (cell in minesweeper.clickedCells and 
+              cell not in minesweeper.mines):
+            count = minesweeper.getNeighboringMineCount(cell)
+            if count != 0:
+                draw.text(((left + right) // 2, (top + bottom) // 2), 
+                          str(count), fill='black', font=self.getFont(),
+                          anchor='mm')
+        # draw the cell border, shared borders add up to the full width
+        draw.rectangle((left, top, right - 1, bottom - 1), outline='black',
+                       width=max(1, self.borderWidth // 2))
+
+    def drawTile(self, tile, minesweeper):
+        """
+        This function draws every cell of a new tile into its bitmap.
+        """
+        firstCell, lastCell = self.getTileCells(tile)
+        tileLeft, tileTop, _, _ = self.getCellBox(firstCell)
+        _, _, tileRight, tileBottom = self.getCellBox(lastCell)
+        tileImage = Image.new('RGBA', (tileRight - tileLeft, 
+                                       tileBottom - tileTop))
+        for row in range(firstCell[0], lastCell[0] + 1):
+            for col in range(firstCell[1], lastCell[1] + 1):
+                self.drawCell(tileImage, tileLeft, tileTop, (row, col), 
+                              minesweeper)
+        self.tiles[tile] = [tileImage, CMUImage(tileImage)]
+
+    def updateTile(self, tile, cells, minesweeper):
+        """
+        This function draws the changed cells of a tile again, and wraps 
+        the updated bitmap as a new CMUImage.
+        """
+        tileImage = self.tiles[tile][0]
+        tileLeft, tileTop, _, _ = self.getCellBox(self.getTileCells(tile)[0])
+        for cell in cells:
+            self.drawCell(tileImage, tileLeft, tileTop, cell, minesweeper)
+        staleImages.append(self.tiles[tile][1])
+        self.tiles[tile][1] = CMUImage(tileImage)
+
+    def release(self):
+        """
+        This function releases the CMUImages of all the tiles, once the 
+        tiles will no longer be drawn.
+        """
+        for tileImage, image in self.tiles.values():
+            staleImages.append(image)
+        self.tiles = dict()
+        self.changedTiles = dict()
+
+    def draw(self, left, top, viewLeft, viewTop, viewWidth, viewHeight, 
+             minesweeper):
+        """
+        This function draws the tiles that are visible in the viewport, 
+        first updating any tiles that have changed since the last frame.
+        The viewport is given in board pixels, and is drawn at left, top.
+        """
+        releaseStaleImages()
+        for tile, cells in self.changedTiles.items():
+            self.updateTile(tile, cells, minesweeper)
+        self.changedTiles = dict()
+        # get the range of visible cells, and the tiles they are in
+        firstRow = int(viewTop / self.cellHeight)
+        firstCol = int(viewLeft / self.cellWidth)
+        lastRow = min(self.rows - 1, 
+                      int((viewTop + viewHeight - 1) / self.cellHeight))
+        lastCol = min(self.cols - 1, 
+                      int((viewLeft + viewWidth - 1) / self.cellWidth))
+        firstTile = self.getTile((firstRow, firstCol))
+        lastTile = self.getTile((lastRow, lastCol))
+        # draw only the visible tiles
+        for tileRow in range(firstTile[0], lastTile[0] + 1):
+            for tileCol in range(firstTile[1], lastTile[1] + 1):
+                tile = (tileRow, tileCol)
+                if tile not in self.tiles:
+                    self.drawTile(tile, minesweeper)
+                else:
+                    # move the tile to the end, as the last one drawn
+                    self.tiles[tile] = self.tiles.pop(tile)
+                tileLeft, tileTop, _, _ = self.getCellBox(
+                                            self.getTileCells(tile)[0])
+                drawImage(self.tiles[tile][1], left + tileLeft - viewLeft, 
+                          top + tileTop - viewTop)
+        # forget the tiles that were drawn the longest time ago
+        while len(self.tiles) > self.maxTiles:
+            oldestTile = next(iter(self.tiles))
+            staleImages.append(self.tiles.pop(oldestTile)[1])
+
+class ViewportMask:
+    """
+    This class covers the parts of the board tiles that stick out of the 
+    viewport, by drawing the background again around the viewport.
+    """
+    def __init__(self, left, top, width, height, appWidth=800, 
+                 appHeight=800):
+        # the strips are shared by every game with the same viewport
+        self.strips = getAsset(('viewportMask', left, top, width, height, 
+                                appWidth, appHeight), self.makeStrips, 
+                               left, top, width, height, appWidth, appHeight)
+
+    def makeStrips(self, left, top, width, height, appWidth, appHeight):
+        """
+        This method crops the four strips of the background around the 
+        viewport, and returns (left, top, CMUImage) for every strip.
+        """
+        # the background is drawn over the whole window
+        background = getImage('grass.jpeg').resize((appWidth, appHeight))
+        right, bottom = left + width, top + height
+        strips = []
+        for box in [(0, 0, appWidth, top), 
+                    (0, bottom, appWidth, appHeight),
+                    (0, top, left, bottom), 
+                    (right, top, appWidth, bottom)]:
+            strips.append((box[0], box[1], CMUImage(background.crop(box))))
+        return strips
+
+    def draw(self):
+        # draw the strips
+        for stripLeft, stripTop, strip in self.strips:
+            drawImage(strip, stripLeft, stripTop)
         
 
-class Minesweeper:
+class Minesweeper(MinesweeperEngine):
     """
     This class allows for the gameplay of the Minesweeper game.
-    Draws the board and appropriate buttons, and handles gameplay.
+    Draws the board and appropriate buttons, and handles user actions.
+    The rules of the game are handled by MinesweeperEngine.
     
     Citations: 
     1. Drawing a 2D Grid was taken from chapter 5, section 3.2 in CS Academy
     """
-    def __init__(self, rows, cols, mines):
-        # board constants
-        self.rows = rows
-        self.cols = cols
-        self.numberOfMines = mines
+    def __init__(self, rows, cols, mines, seed=None):
+        super().__init__(rows, cols, mines, seed=seed)
         # grid dimensions
         self.boardLeft = 150
         self.boardTop = 150
         self.boardWidth = 500
         self.boardHeight = 500
         self.cellBorderWidth = 2
-        # initialize a 2D list for the grid that will be used
-        self.grid = [([False] * self.cols) for row in range(self.rows)]
-        # get a set of all the cells in the grid
-        self.cells = set()
-        for row in range(len(self.grid)):
-            for col in range(len(self.grid)):
-                self.cells.add((row, col))
-        # initialize a set of the mines, and cells that have been clicked
-        self.mines = set()
-        self.clickedCells = set()
-        self.floodedCells = set()
-        # initialize the bomb 
-        self.bomb = Bomb()
-        self.bombGif = BombGif()
-        # game over bool
-        self.gameOver = False
+        # smallest, starting and largest cell size in pixels, used when 
+        # the board is too big to fit, and the smallest fitted cell size 
+        # that is still readable
+        self.minCellSize = 5
+        self.startCellSize = 20
+        self.maxCellSize = 100
+        self.readableCellSize = 10
+        # zoom relative to fitting the whole board, and the top left of 
+        # the part of the board shown (in board pixels)
+        fitSize = min(self.boardWidth / self.cols, 
+                      self.boardHeight / self.rows)
+        # boards that fit with readable cells start unzoomed
+        self.zoom = 1
+        if fitSize < self.readableCellSize:
+            self.zoom = self.startCellSize / fitSize
+        self.updateCellSize()
+        self.viewLeft = 0
+        self.viewTop = 0
+        # cached bitmaps of the board
+        self.boardTiles = self.makeBoardTiles()
+        self.viewportMask = None
+        # images and sounds
+        self.loadAssets()
         # flag coords
         self.flagBoxLeft = self.boardLeft + (self.boardWidth//2 + 20)
         self.flagBoxTop = 700
         self.flagBoxWidth = self.boardWidth//2
         self.flagBoxHeight = 75
-        self.flag = Flag()
         # AI Coords
         self.AIBoxWidth = self.boardWidth//2
         self.AIBoxHeight = 75
         self.AIBoxLeft = self.boardLeft
         self.AIBoxTop = 700
-        # AI Class initialized
-        self.AI = MinesweeperAI(self.rows, self.cols)
         self.clickFlag = False
-        self.flagCells = set()
-        # first list coords
-        self.firstCell = None
-        self.initialSafes = set()
-        self.firstFlood = False
         # save coords
         self.saveLeft = 15
         self.saveTop = 700
@@ -182,18 +564,51 @@ class Minesweeper:
         self.loadTop = 700
         self.saveWidth = 100
         # sound
-        self.bombSound = soundPlay('explosion.mp3')
-        self.beepSound = soundPlay('score.mp3')
-        self.flagSound = soundPlay('flag.mp3')
-        self.victorySound = soundPlay('victory.mp3')
         self.victoryPlayed = False
         self.soundPlay = True
+        self.bombsShown = False
         # score
         self.timer = 0
         # max AI moves
         self.maxAIMoves = None
         self.mode = None
         self.AIClicks = 0
+
+    def loadAssets(self):
+        """
+        This function gets the images and sounds of the game from the 
+        shared asset cache, so they are only loaded once per process.
+        """
+        # initialize the bomb 
+        self.bomb = Bomb()
+        self.bombGif = BombGif()
+        self.flagImage = Flag()
+        # sound
+        self.bombSound = getSound('explosion.mp3')
+        self.beepSound = getSound('score.mp3')
+        self.flagSound = getSound('flag.mp3')
+        self.victorySound = getSound('victory.mp3')
+
+    def __getstate__(self):
+        # images and sounds are not saved, they come back from the cache
+        state = self.__dict__.copy()
+        for name in ['bomb', 'bombGif', 'flagImage', 'bombSound', 
+                     'beepSound', 'flagSound', 'victorySound']:
+            del state[name]
+        # the shared viewport mask is fetched again when it is drawn
+        state['viewportMask'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.loadAssets()
+
+    def releaseBitmaps(self):
+        """
+        This function releases the cached bitmaps of the board, once this 
+        game is replaced by another one.
+        """
+        self.boardTiles.release()
     
     def stepScore(self):
         """
@@ -209,56 +624,6 @@ class Minesweeper:
         """
         return self.timer
         
-    def setBoard(self):
-        """
-        This function generates a board with mines, given the first cell was 
-        clicked.
-        """
-        # get the neighbors of the first safe cell
-        neighbors = self.getNeighboringCells(self.firstCell)
-        # add the initial cell and all its neighbors to a initial safe set
-        self.initialSafes.add(self.firstCell)
-        for neighbor in neighbors:
-            self.initialSafes.add(neighbor)
-        # randomly assign mines outside of the safe cells.
-        self.assignMines()
-        # indicate that we want to draw a floodfill from the first click
-        self.drawFloodFill(self.firstCell)
-    
-    def assignMines(self):
-        """
-        This function randomly assigns the designated number of mines on the 
-        grid.
-        Stores them in the self.mines set.
-        """     
-        # randomly place 10 mines on the grid
-        while len(self.mines) != self.numberOfMines:
-            # add mine row and col
-            mineRow = random.randrange(self.rows)
-            mineCol = random.randrange(self.cols)
-            # add to mine set and set value to True
-            if ((mineRow, mineCol) not in self.mines and 
-                (mineRow, mineCol) not in self.initialSafes):
-                self.mines.add((mineRow, mineCol))
-                self.grid[mineRow][mineCol] = True
-    
-    def getNeighboringMineCount(self, cell):
-        """
-        This function gets the number of neighboring cells that are mines.
-        Takes in a current cell in tuple (row, col) as an argument.
-        """
-        # iterate through all the cell's neighbors
-        # check if there is a mine in one of the cells
-        mineCount = 0
-        for examinedRow in range(cell[0] - 1, cell[0] + 2):
-            for examinedCol in range(cell[1] - 1, cell[1] + 2):
-                if ((0 <= examinedRow < self.rows) and 
-                    (0 <= examinedCol < self.cols)):
-                    if self.grid[examinedRow][examinedCol]:
-                        # increment mine count by 1
-                        mineCount += 1
-        return mineCount
-    
     def drawGrid(self):
         """
         This function draws the grid.
@@ -329,108 +694,38 @@ class Minesweeper:
         
     def drawBoard(self):
         """
-        This function draws the board and each individual cell, keeping in
-        track any conditions each cell may be under 
-        (a potential bomb, flag, or normal count).
-        """
-        # iterate through the length of the board
-        for row in range(self.rows):
-            for col in range(self.cols):
-                cell = (row, col)
-                # draw the cell in corresponding color
-                if cell in self.floodedCells:
-                    self.drawCell(cell, 'lightGreen')
-                else:
-                    self.drawCell(cell)
-                # draw the flag on the selected cell
-                if cell in self.flagCells:
-                    self.drawFlag(cell)
-                # draw a bomb if a mine is clicked
-                elif (cell in self.clickedCells and self.grid[row][col]):
-                    self.gameOver = True
-                    self.drawBombGif(cell)
-                    self.drawAllBombs()
-                    if self.soundPlay:
-                        self.bombSound.play()
-                        self.soundPlay = False
-                    # self.drawBomb(cell)
-                # otherwise, get the count and draw the count of nearest mines
-                elif cell in self.clickedCells and not self.grid[row][col]:
-                    count = self.getNeighboringMineCount(cell)
-                    # if the count is 0, floodfill the other neighbors 
-                    # that are 0
-                    if count == 0:
-                        self.drawFloodFill(cell)
-                    else:   
-                        self.drawCount(count, cell)
-    
-    def drawAllBombs(self):
-        """
-        This function draws all the bombs in red if a mine is clicked
-        """
-        for mine in self.mines:
-            # if the game is over, draw all the mines
-            # change cell color to red
-            if mine not in self.clickedCells and mine not in self.flagCells:
-                self.drawCell(mine, 'red')
-                self.drawBomb(mine)
-                        
-    def drawFloodFill(self, cell):
-        """
-        This function is called when a specific cell is clicked, 
-        and has a count of 0.
-        Recursively checks all neighbors to see if any of them have a 
-        count of 0. 
-        'clears' all the cells by drawing them as grey, to make the game 
-        easier.
-        Takes in a specific cell given by (row, col) as input.
-        """
-        # if the cell is in the flooded set, return without doing anything.
-        if cell in self.floodedCells:
-            return
-        # add the cell to the AI's knowledge
-        self.getAICell(cell)
-        # if the cell is 0, add to clicked and break
-        if self.getNeighboringMineCount(cell) != 0:
-            self.clickedCells.add(cell)
-            return
-        # add the cell to the flooded set
-        self.floodedCells.add(cell)
-        # add cell to clicked
-        self.clickedCells.add(cell)
-        # get all the neighboring cells
-        neighbors = self.getNeighboringCells(cell)
-        # iterate through all neighbors
-        for neighbor in neighbors:
-            # recursively call on all the neighbors
-            self.drawFloodFill(neighbor)
-            
-    def getNeighboringCells(self, cell):
-        """
-        Helper function that returns a list of all the neighbors of a cell.
-        Takes in a specific given by (row, col) as input.
-        """
-        # iterate through all the cell's neighbors
-        # add to list if valid cell
-        neighbors = []
-        # iterate through all possible combinations of drow and col
-        for examinedRow in range(cell[0] - 1, cell[0] + 2):
-            for examinedCol in range(cell[1] - 1, cell[1] + 2):
-                # check if the neighbor is a valid neighbor and append to list
-                if ((0 <= examinedRow < self.rows) 
-                    and (0 <= examinedCol < self.cols)):
-                        neighbors.append((examinedRow, examinedCol))
-        return neighbors
-        
-    def drawBomb(self, cell):
-        """
-        This function draws the bomb when called.
-        Takes in a specific cell given by (row, col) to draw the bomb on.
-        """
-        # get dimensions
-        cellLeft, cellTop = self.getCellLeftTop(cell)
-        cellWidth, cellHeight = self.getCellSize()
-        self.bomb.draw(cellLeft, cellTop, cellWidth, cellHeight)
+        This function draws the board from its cached tiles, drawing again 
+        only the cells that changed since the last frame.
+        Draws the exploding bomb if a mine was clicked.
+        """
+        # if a mine was clicked, all the other mines have to be drawn
+        if self.explodedCell != None and not self.bombsShown:
+            self.changedCells |= self.mines
+            self.bombsShown = True
+        # send the changed cells to the tiles
+        for cell in self.changedCells:
+            self.boardTiles.markChanged(cell)
+        self.changedCells.clear()
+        self.boardTiles.draw(self.boardLeft, self.boardTop, self.viewLeft, 
+                             self.viewTop, self.boardWidth, 
+                             self.boardHeight, self)
+        # draw a bomb if a mine is clicked
+        if self.explodedCell != None:
+            if self.isCellVisible(self.explodedCell):
+                self.drawBombGif(self.explodedCell)
+            if self.soundPlay:
+                self.bombSound.play()
+                self.soundPlay = False
+        # cover the tiles outside of the viewport if the board is too big
+        boardPixelWidth, boardPixelHeight = self.getBoardPixelSize()
+        if (boardPixelWidth > self.boardWidth + 1 or 
+            boardPixelHeight > self.boardHeight + 1):
+            if self.viewportMask == None:
+                self.viewportMask = ViewportMask(self.boardLeft, 
+                                                 self.boardTop,
+                                                 self.boardWidth, 
+                                                 self.boardHeight)
+            self.viewportMask.draw()
     
     def drawBombGif(self, cell):
         """
@@ -442,16 +737,6 @@ class Minesweeper:
         cellWidth, cellHeight = self.getCellSize()
         self.bombGif.draw(cellLeft, cellTop, cellWidth, cellHeight)
     
-    def drawFlag(self, cell):
-        """
-        This function draws the flag when called. 
-        Takes in a specific cell given by (row, col) to draw the flag on.
-        """
-        # get dimensions
-        cellLeft, cellTop = self.getCellLeftTop(cell)
-        cellWidth, cellHeight = self.getCellSize()
-        self.flag.draw(cellLeft, cellTop, cellWidth, cellWidth)
-        
     def drawBoardBorder(self):
         """
         This function draws the board border (part of drawing grid)
@@ -462,143 +747,175 @@ class Minesweeper:
            fill=None, border ='black',
            borderWidth=2*self.cellBorderWidth)
     
-    def drawCell(self, cell, fillColor=None):
-        """
-        This function draws a cell, given by row, col.
-        Takes in optional parameter fillColor if specified.
-        """
-        # draw the cell with specified fill color
-        cellLeft, cellTop = self.getCellLeftTop(cell)
-        cellWidth, cellHeight = self.getCellSize()
-        drawRect(cellLeft, cellTop, cellWidth, cellHeight,
-                fill=fillColor, border='black',
-                borderWidth=self.cellBorderWidth)
-    
-    def drawCount(self, count, cell):
-        """
-        This function draws the count of the neighboring mines on a 
-        particular cell, given by (row, col).
-        
-        Takes in the count, row, and col of the cell as input.
-        """
-        # draw the counter in the center of the cell
-        cellLeft, cellTop = self.getCellLeftTop(cell)
-        cellWidth, cellHeight = self.getCellSize()
-        drawLabel(count,
-                  cellLeft + cellWidth//2,
-                  cellTop + cellHeight//2,
-                  size=25, fill='black', bold=True)
-        
     def getCellLeftTop(self, cell):
         """
         This helper function (used to draw the cell), gets the cell's left and 
-        top coords.
+        top coords on the screen, given the current viewport.
         """
         # get the cell's left, top position
         cellWidth, cellHeight = self.getCellSize()
-        cellLeft = self.boardLeft + cell[1] * cellWidth
-        cellTop = self.boardTop + cell[0] * cellHeight
+        cellLeft = self.boardLeft + cell[1] * cellWidth - self.viewLeft
+        cellTop = self.boardTop + cell[0] * cellHeight - self.viewTop
         return (cellLeft, cellTop)
 
     def getCellSize(self):
         """
-        This helper function (used to draw the cell), gets the cell's size.
+        This helper function (used to draw the cell), gets the cell's size
+        at the current zoom.
         """
         # get the cell's size
-        cellWidth = self.boardWidth / self.cols
-        cellHeight = self.boardHeight / self.rows
-        return (cellWidth, cellHeight)
+        return (self.cellWidth, self.cellHeight)
+
+    def updateCellSize(self):
+        """
+        This helper function computes the cell's size when the zoom 
+        changes, so that it doesn't have to be computed for every cell.
+        """
+        self.cellWidth = self.boardWidth / self.cols * self.zoom
+        self.cellHeight = self.boardHeight / self.rows * self.zoom
+
+    def getBoardPixelSize(self):
+        """
+        This helper function gets the size of the whole board in pixels at 
+        the current zoom.
+        """
+        cellWidth, cellHeight = self.getCellSize()
+        return (self.cols * cellWidth, self.rows * cellHeight)
+
+    def makeBoardTiles(self):
+        """
+        This helper function makes new cached bitmaps for the current zoom.
+        """
+        cellWidth, cellHeight = self.getCellSize()
+        return BoardTiles(self.rows, self.cols, cellWidth, cellHeight, 
+                          self.cellBorderWidth)
+
+    def isCellVisible(self, cell):
+        """
+        This helper function checks if any part of a cell is in the viewport.
+        """
+        cellLeft, cellTop = self.getCellLeftTop(cell)
+        cellWidth, cellHeight = self.getCellSize()
+        return (self.boardLeft - cellWidth < cellLeft < 
+                self.boardLeft + self.boardWidth and
+                self.boardTop - cellHeight < cellTop < 
+                self.boardTop + self.boardHeight)
+
+    def scrollBoard(self, dx, dy):
+        """
+        This function moves the viewport by dx, dy pixels, keeping it 
+        inside the board.
+        """
+        boardPixelWidth, boardPixelHeight = self.getBoardPixelSize()
+        self.viewLeft = max(0, min(self.viewLeft + dx, 
+                                   boardPixelWidth - self.boardWidth))
+        self.viewTop = max(0, min(self.viewTop + dy, 
+                                  boardPixelHeight - self.boardHeight))
+
+    def scrollToCell(self, cell):
+        """
+        This function centers the viewport on a cell if it is not visible.
+        """
+        if self.isCellVisible(cell):
+            return
+        cellLeft, cellTop = self.getCellLeftTop(cell)
+        cellWidth, cellHeight = self.getCellSize()
+        self.scrollBoard(cellLeft + cellWidth/2 - 
+                         (self.boardLeft + self.boardWidth/2),
+                         cellTop + cellHeight/2 - 
+                         (self.boardTop + self.boardHeight/2))
+
+    def zoomBoard(self, factor):
+        """
+        This function zooms the board in (factor > 1) or out (factor < 1)
+        around the center of the viewport.
+        Cells can't get smaller than fitting the whole board.
+        """
+        fitSize = min(self.boardWidth / self.cols, 
+                      self.boardHeight / self.rows)
+        minZoom = max(1, self.minCellSize / fitSize)
+        maxZoom = max(1, self.maxCellSize / fitSize)
+        newZoom = max(minZoom, min(self.zoom * factor, maxZoom))
+        if newZoom == self.zoom:
+            return
+        # keep the center of the viewport at the same spot on the board
+        centerX = self.viewLeft + self.boardWidth/2
+        centerY = self.viewTop + self.boardHeight/2
+        scale = newZoom / self.zoom
+        self.zoom = newZoom
+        self.updateCellSize()
+        self.viewLeft = centerX * scale - self.boardWidth/2
+        self.viewTop = centerY * scale - self.boardHeight/2
+        self.scrollBoard(0, 0)
+        # the cached bitmaps are drawn again at the new size
+        self.boardTiles.release()
+        self.boardTiles = self.makeBoardTiles()
 
     def getCell(self, mouseX, mouseY):
         """
         This function is called by main when a mouse click is pressed.
         Takes in a mouseX, mouseY coordinate as input and does the following:
-            1) Gets the count of the neighboring cells that are mines
-            2) Adds to the AI's knowledge if the cell is safe.
-            3) Adds to the clicked cells set.
-            4) If the cell is a flag, then add to the flagCells set
-        """
+            1) Reveals the cell if it is not flagged (which also adds to the 
+               AI's knowledge if the cell is safe).
+            2) If the flag cursor is active, toggles the flag on the cell.
+        """
+        # ignore clicks outside of the viewport
+        if not (self.boardLeft <= mouseX <= self.boardLeft + self.boardWidth
+                and 
+                self.boardTop <= mouseY <= self.boardTop + self.boardHeight):
+            return
         # get the cell given by a set of mouseX , mouseY) coordinates
-        for row in range(self.rows):
-            for col in range(self.cols):
-                cell = (row, col)
-                cellLeft, cellTop = self.getCellLeftTop(cell)
-                cellWidth, cellHeight = self.getCellSize()
-                # check if the mouse was clicked on the cell
-                if ((cellLeft <= mouseX <= cellLeft + cellWidth) and 
-                        (cellTop <= mouseY <= cellTop + cellHeight)):
-                    # check if the click was the first click
-                    if self.firstCell == None:
-                        self.firstCell = cell
-                        # add to the AI's knowledge
-                        self.AI.addKnowledge((row, col), 0)
-                        # add to clicked and cleared cells
-                        self.clickedCells.add((row, col))
-                        self.setBoard()
-                        self.beepSound.play(restart=True)
-                    else:
-                        count = self.getNeighboringMineCount(cell)
-                        if cell not in self.mines and not self.clickFlag:
-                            self.beepSound.play(restart=True)
-                            self.AI.addKnowledge(cell, count)
-                        # remove a flag from the cell if it is clicked
-                        if self.clickFlag and cell in self.flagCells:
-                            self.flagCells.remove(cell)
-                            self.clickFlag = False
-                        # if we are clicking a flag
-                        elif self.clickFlag and cell not in self.flagCells:
-                            self.flagCells.add(cell)
-                            self.flagSound.play(restart=True)
-                            self.clickFlag = False
-                        elif cell in self.flagCells and not self.clickFlag:
-                            continue
-                        else:
-                            # add cell to clicked
-                            self.clickedCells.add(cell)
-                            
+        row = int((mouseY - self.boardTop + self.viewTop) / self.cellHeight)
+        col = int((mouseX - self.boardLeft + self.viewLeft) / self.cellWidth)
+        if not (0 <= row < self.rows and 0 <= col < self.cols):
+            return
+        cell = (row, col)
+        # check if the click was the first click
+        if self.firstCell == None:
+            self.reveal(cell)
+            self.beepSound.play(restart=True)
+        # if we are clicking with the flag cursor
+        elif self.clickFlag:
+            if self.flag(cell):
+                self.flagSound.play(restart=True)
+            self.clickFlag = False
+        # flagged cells can't be clicked
+        elif cell not in self.flagCells:
+            if cell not in self.mines:
+                self.beepSound.play(restart=True)
+            self.reveal(cell)
                         
     def getAICell(self, cell):
         """
         This function is called by main when the AI is trying to make a move.
-        Takes in a row, col as input, and adds to the AI's knowledge based on 
-        the count of that cell.
-        Adds to clicked cells.
-        """
-        # find the cell
-        for rowIndex in range(self.rows):
-            for colIndex in range(self.cols):
-                row, col = cell[0], cell[1]
-                # if this is the cell
-                if row == rowIndex and colIndex == col:
-                    if cell not in self.mines and not self.clickFlag:
-                        self.beepSound.play(restart=True)
-                    # check if the click was the first click
-                    if self.firstCell == None:
-                        self.firstCell = cell
-                        # add to the AI's knowledge
-                        self.AI.addKnowledge((row, col), 0)
-                        # add to clicked and cleared cells
-                        self.clickedCells.add((row, col))
-                        self.setBoard()
-                    else:
-                        # get the count of the cell
-                        count = self.getNeighboringMineCount(cell)
-                        # add to the AI's knowledge
-                        self.AI.addKnowledge((row, col), count)
-                        # add to clicked and cleared cells
-                        self.clickedCells.add((row, col))
-                    break
+        Takes in a row, col as input, and reveals that cell (which adds to 
+        the AI's knowledge based on the count of that cell).
+        """
+        if cell not in self.mines and not self.clickFlag:
+            self.beepSound.play(restart=True)
+        self.reveal(cell)
+        # show the AI's move if it is outside of the viewport
+        self.scrollToCell(cell)
     
     def checkWin(self):
         """
         This function is called by main to check if we have won the game
-        Game is won if the user clicks on all the safe cells.
+        Plays the victory sound the first time the game is won.
         """
         # return True if the win condition is satisfied
-        if ((self.cells - self.clickedCells == set() and not self.gameOver) or
-        (self.cells - self.clickedCells == self.mines)):
+        if super().checkWin():
             if not self.victoryPlayed:
                 self.victorySound.play(restart=True)
                 self.victoryPlayed = True
             return True
-        return False
\ No newline at end of file
+        return False
+
+class EndlessMinesweeper(Minesweeper, EndlessEngine):
+    """
+    This class draws a game on an endless board, whose mines are placed 
+    chunk by chunk as the board is explored.
+    Starts with the view in the middle of the board.
+    """
+    def __init__(self, rows, cols, mines, seed=None):
+        super().__init__(rows, cols, mines, seed=seed)
+        self.scrollToCell((self.rows // 2, self.cols // 2))
@@ -0,0 +1,199 @@
+"""
+This file implements an endless Minesweeper board, which is too big to hold
+in memory. The board is split into square chunks, and the mines of a chunk
+are only placed when a cell near it is first looked at, from the seed of
+the game and the position of the chunk. Memory grows with the part of the
+board that was explored, not with the size of the board.
+"""
+import random
+from minesweeperEngine import *
+
+class EndlessAI(MinesweeperAI):
+    """
+    This class is the AI player of an endless board.
+    Stores its statements as sets of cells, and draws random moves from a 
+    ring around the box of the cells that were played, instead of keeping 
+    every cell of the board.
+    """
+    knowledgeClass = SparseKnowledge
+
+    # number of cells around the played cells that random moves can reach
+    randomMargin = 16
+
+    def makeCandidates(self):
+        # the board is too big to list its cells, only the (top, left, 
+        # bottom, right) box of the played cells and mines is kept
+        self.playedBox = None
+
+    def removeCandidate(self, cell):
+        """
+        Grows the box of the played cells and mines to hold a cell that was 
+        played or marked as a mine.
+        """
+        if self.playedBox == None:
+            self.playedBox = (cell[0], cell[1], cell[0], cell[1])
+            return
+        top, left, bottom, right = self.playedBox
+        self.playedBox = (min(top, cell[0]), min(left, cell[1]),
+                          max(bottom, cell[0]), max(right, cell[1]))
+
+    def makeRandomMove(self, exclude=()):
+        """
+        Returns a random cell near the cells that were played, that has not 
+        already been chosen, and is not known to be a mine (or in exclude).
+        Draws from the ring of cells 2 to randomMargin cells away from the 
+        box of the played cells and mines. Every statement, known cell and 
+        excluded frontier cell is next to a played cell, so the ring only 
+        holds cells that can be drawn, and a move never has to retry.
+        """
+        if self.playedBox == None:
+            return (self.rows // 2, self.cols // 2)
+        top, left, bottom, right = self.playedBox
+        # the inner box holds every cell that can't be drawn
+        innerTop, innerLeft = max(0, top - 1), max(0, left - 1)
+        innerBottom = min(self.rows - 1, bottom + 1)
+        innerRight = min(self.cols - 1, right + 1)
+        outerTop = max(0, top - self.randomMargin)
+        outerLeft = max(0, left - self.randomMargin)
+        outerBottom = min(self.rows - 1, bottom + self.randomMargin)
+        outerRight = min(self.cols - 1, right + self.randomMargin)
+        # the ring is the strips above, below, left and right of the inner 
+        # box, given as (top, left, bottom, right)
+        strips = [(outerTop, outerLeft, innerTop - 1, outerRight),
+                  (innerBottom + 1, outerLeft, outerBottom, outerRight),
+                  (innerTop, outerLeft, innerBottom, innerLeft - 1),
+                  (innerTop, innerRight + 1, innerBottom, outerRight)]
+        areas = [max(0, stripBottom - stripTop + 1) * 
+                 max(0, stripRight - stripLeft + 1)
+                 for stripTop, stripLeft, stripBottom, stripRight in strips]
+        if sum(areas) == 0:
+            # the played cells fill the board, look for a cell in the box
+            return self.findUnplayedCell(exclude)
+        # pick a cell of the ring, and find the strip it is in
+        index = random.randrange(sum(areas))
+        for (stripTop, stripLeft, stripBottom, stripRight), area in zip(
+                strips, areas):
+            if index < area:
+                width = stripRight - stripLeft + 1
+                return (stripTop + index // width, stripLeft + index % width)
+            index -= area
+
+    def findUnplayedCell(self, exclude):
+        """
+        Returns a random cell of the board that has not been played, and is 
+        not known to be a mine (or in exclude), or None if there is none.
+        Only used once the played cells fill the whole board.
+        """
+        cells = [(row, col) for row in range(self.rows) 
+                 for col in range(self.cols)
+                 if (row, col) not in self.movesMade and 
+                 (row, col) not in self.mines and (row, col) not in exclude]
+        if not cells:
+            return None
+        return random.choice(cells)
+
+class EndlessEngine(MinesweeperEngine):
+    """
+    This class holds the state of a game on an endless board.
+    The mines of each chunk are placed the first time one of its cells or
+    their neighbors is looked at, with the same density as the number of
+    mines over the number of cells. The game can't be won, only lost.
+    """
+    AIClass = EndlessAI
+
+    # number of rows and columns of cells in a chunk
+    chunkSize = 32
+
+    def __init__(self, rows, cols, mines, strategy="rules", seed=None):
+        super().__init__(rows, cols, mines, strategy, seed)
+        # number of mines placed in every chunk
+        self.minesPerChunk = int(mines / (rows * cols) * self.chunkSize ** 2)
+        # chunks whose mines have been placed
+        self.chunks = set()
+
+    def makeBoardArrays(self):
+        # the board is too big for arrays, chunks are placed lazily instead
+        self.mineMask = None
+        self.countPlane = None
+
+    def getChunk(self, chunkRow, chunkCol):
+        """
+        This function places the mines of a chunk, if they were not placed
+        yet.
+        The mines only depend on the game's seed and the chunk's position,
+        so the same seed always gives the same board.
+        """
+        if (chunkRow, chunkCol) in self.chunks:
+            return
+        self.chunks.add((chunkRow, chunkCol))
+        # a string seed is hashed the same way every time Python runs
+        rng = random.Random(f'{self.seed}:{chunkRow}:{chunkCol}')
+        chunkCells = self.chunkSize ** 2
+        for cellId in rng.sample(range(chunkCells), self.minesPerChunk):
+            cell = (chunkRow * self.chunkSize + cellId // self.chunkSize,
+                    chunkCol * self.chunkSize + cellId % self.chunkSize)
+            if (cell[0] < self.rows and cell[1] < self.cols and
+                cell not in self.initialSafes):
+                self.mines.add(cell)
+
+    def placeChunksAround(self, cell):
+        """
+        This function places the mines of the chunks of a cell and its
+        neighbors.
+        """
+        # chunks are bigger than 3 cells, so the corners of the 3x3 square
+        # (kept on the board) cover all of its chunks
+        for row in (max(0, cell[0] - 1), min(self.rows - 1, cell[0] + 1)):
+            for col in (max(0, cell[1] - 1), min(self.cols - 1, cell[1] + 1)):
+                self.getChunk(row // self.chunkSize, col // self.chunkSize)
+
+    def assignMines(self):
+        """
+        This function clears the mines around the first click, since the
+        mines of the chunks near it were already placed.
+        """
+        self.mines -= self.initialSafes
+
+    def getNeighboringMineCount(self, cell):
+        """
+        This function counts the mines around a cell, placing the mines of
+        the chunks around it first.
+        """
+        self.placeChunksAround(cell)
+        return sum(1 for neighbor in self.getNeighboringCells(cell)
+                   if neighbor in self.mines)
+
+    def floodFill(self, cell):
+        """
+        This function opens the zero region of a cell by searching it with
+        a stack, since regions can't be found ahead of time on an endless
+        board.
+        """
+        if cell in self.floodedCells:
+            return
+        region = {cell}
+        border = set()
+        stack = [cell]
+        while stack:
+            current = stack.pop()
+            for neighbor in self.getNeighboringCells(current):
+                if neighbor in region or neighbor in border:
+                    continue
+                if self.getNeighboringMineCount(neighbor) == 0:
+                    region.add(neighbor)
+                    stack.append(neighbor)
+                else:
+                    border.add(neighbor)
+        self.openRegion(region, border)
+
+    def reveal(self, cell):
+        """
+        This function reveals a cell, placing the mines of the chunks around
+        it first.
+        """
+        self.placeChunksAround(cell)
+        return super().reveal(cell)
+
+    def checkWin(self):
+        # an endless board can't be cleared
+        return False
@@ -0,0 +1,74 @@
+"""
+This file generates patterns.txt, the table of patterns used by the AI.
+Run it with `python generatePatterns.py` whenever the pattern format in
+minesweeperPatterns.py changes.
+
+Every pattern is solved by trying all the ways to place mines in its unknown
+cells, and only the patterns that force at least one cell are kept, in their
+canonical form (the smallest of their symmetries).
+"""
+import itertools
+from minesweeperPatterns import *
+
+def solvePattern(unknownMask, countA, countB):
+    """
+    This function finds the cells a pattern forces to be safe or mines.
+    Returns (safe mask, mine mask), or None if no placement of mines fits
+    the counts.
+    """
+    unknownBits = [bit for bit in range(len(windowOffsets))
+                   if unknownMask & (1 << bit)]
+    alwaysMine = unknownMask
+    neverMine = unknownMask
+    possible = False
+    for values in itertools.product((0, 1), repeat=len(unknownBits)):
+        minesA = sum(value for bit, value in zip(unknownBits, values)
+                     if isNextToA(windowOffsets[bit]))
+        minesB = sum(value for bit, value in zip(unknownBits, values)
+                     if isNextToB(windowOffsets[bit]))
+        if minesA != countA or minesB != countB:
+            continue
+        possible = True
+        mineMask = sum(1 << bit for bit, value in zip(unknownBits, values)
+                       if value)
+        alwaysMine &= mineMask
+        neverMine &= ~mineMask
+    if not possible:
+        return None
+    return neverMine, alwaysMine
+
+def generatePatterns():
+    """
+    This function solves every pattern and returns the lines of the
+    canonical patterns that force at least one cell.
+    """
+    symmetries = getWindowSymmetries()
+    lines = []
+    for unknownMask in range(1 << len(windowOffsets)):
+        unknownA = sum(1 for bit, offset in enumerate(windowOffsets)
+                       if unknownMask & (1 << bit) and isNextToA(offset))
+        unknownB = sum(1 for bit, offset in enumerate(windowOffsets)
+                       if unknownMask & (1 << bit) and isNextToB(offset))
+        for countA in range(unknownA + 1):
+            for countB in range(unknownB + 1):
+                key = (unknownMask, countA, countB)
+                # only keep the canonical form of every pattern
+                if min(transformPattern((key, (0, 0)), symmetry)[0]
+                       for symmetry in symmetries) != key:
+                    continue
+                forced = solvePattern(unknownMask, countA, countB)
+                if forced == None or forced == (0, 0):
+                    continue
+                safeMask, mineMask = forced
+                lines.append(f'{unknownMask:x} {countA} {countB} '
+                             f'{safeMask:x} {mineMask:x}')
+    return lines
+
+if __name__ == '__main__':
+    lines = generatePatterns()
+    with open(patternsPath, 'w') as patternsFile:
+        patternsFile.write('# unknown mask, count of A, count of B, '
+                           'safe mask, mine mask (see minesweeperPatterns.py)\n')
+        for line in lines:
+            patternsFile.write(line + '\n')
+    print(f'wrote {len(lines)} patterns to {patternsPath}')
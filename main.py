@@ -2,11 +2,29 @@
 Main code file to run the game.
 """
 from drawMinesweeper import *
+from aiWorker import *
+from boardPool import *
 import pickle
 
 def onAppStart(app):
     app.maxAIMoves = None
     app.mode = 'Unlimited AI'
+    # board sizes that can be chosen on the welcome screen
+    # (name, rows, cols, mines)
+    app.boardSizes = [('Beginner', 9, 9, 10), ('Intermediate', 16, 16, 40),
+                      ('Expert', 16, 30, 99), 
+                      ('Huge', 1000, 1000, 150000),
+                      ('Endless', 2 ** 20, 2 ** 20, 2 ** 40 // 6)]
+    app.boardSize = app.boardSizes[0]
+    # seconds the AI can spend on a guess, so a frame never waits too long
+    app.AITimeBudget = 0.05
+    # thread that works out the AI's next guess while the user thinks
+    app.AIWorker = AIWorker(app.AITimeBudget)
+    # boards that can be solved without guessing, generated in the 
+    # background so that restarting is instant
+    app.noGuessBoards = True
+    app.boardPool = BoardPool()
+    app.minesweeper = None
     restartApp(app)
 
 def restartApp(app):
@@ -14,8 +32,23 @@ def restartApp(app):
     app.height = 800
     app.message = "Press r to restart the game."
     app.gameOver = False
-    # define minesweeper object
-    app.minesweeper = Minesweeper(9, 9, 10)
+    # define minesweeper object, using a ready no-guess board if there is 
+    # one, and opening it from its first click
+    name, rows, cols, mines = app.boardSize
+    # the bitmaps of the last game are no longer drawn
+    if app.minesweeper != None:
+        app.minesweeper.releaseBitmaps()
+    board = None
+    if app.noGuessBoards and name != 'Endless':
+        board = app.boardPool.getBoard(rows, cols, mines)
+    if name == 'Endless':
+        app.minesweeper = EndlessMinesweeper(rows, cols, mines)
+    elif board == None:
+        app.minesweeper = Minesweeper(rows, cols, mines)
+    else:
+        seed, firstCell = board
+        app.minesweeper = Minesweeper(rows, cols, mines, seed=seed)
+        app.minesweeper.reveal(firstCell)
     app.backgroundObj = Background()
     # text params
     app.textSize = 60
@@ -86,6 +119,9 @@ def welcome_redrawAll(app):
                     bold=True)
     drawLabel(f"Mode = {app.mode}", app.width/2, 240, size=35, 
             font='fantasy', fill='black', bold=True)
+    drawLabel(f"Board = {app.boardSize[0]} (press 1-5 to change)", 
+              app.width/2, 280, size=25, font='fantasy', fill='black', 
+              bold=True)
     drawHelpButton(app)
     # draw the difficulty boxes
     welcome_drawUnlimitedBox(app)
@@ -156,6 +192,9 @@ def welcome_onMousePress(app, mouseX, mouseY):
         setActiveScreen('tutorial')
 
 def welcome_onKeyPress(app, key):
+    # choose the board size
+    if key in ['1', '2', '3', '4', '5']:
+        app.boardSize = app.boardSizes[int(key) - 1]
     if key == 'space':
         restartApp(app)
         app.minesweeper.maxAIMoves = app.maxAIMoves
@@ -229,12 +268,14 @@ def game_redrawAll(app):
     else:
         # draw grass background
         app.backgroundObj.draw(0, 0, app.width, app.height)
+        # draw the board first, since big boards cover the rest of the 
+        # screen with the background again
+        app.minesweeper.drawGrid()
         drawLabel("Mine Smarter!", app.width/2, 40, size = 70, font='fantasy', 
                 fill='red', bold = True)
         if app.message != None:
             drawLabel(app.message, app.width/2, 90, size = app.messageSize, 
                       font='fantasy', fill=app.messageColor, bold = True)
-        app.minesweeper.drawGrid()
         drawLabel(f"Time: {app.minesweeper.getScore()} sec.", app.width/2, 
                   125, size=app.messageSize, font='fantasy', fill='black', 
                   bold = True)
@@ -294,7 +335,7 @@ def game_drawAIRandomConfirmation(app):
     # draw confirmation text
     drawLabel("ALERT", app.width//2, 100, fill='red', size=40, 
               font='fantasy', bold = True)
-    drawLabel("Heads up! AI is about to make a random move.", 
+    drawLabel("Heads up! AI has to guess the safest move.", 
               app.width//2, app.height//2 - 80, 
               fill='black', size=25, font='fantasy', bold = True)
     drawLabel("Press 'y' to continue, 'n' to make your own move", 
@@ -323,18 +364,9 @@ def game_onMousePress(app, mouseX, mouseY):
             app.minesweeper.saveTop <= mouseY <= 
             app.minesweeper.saveTop + app.minesweeper.AIBoxHeight):
             # Save the minesweeper state with the checkpoint file using pickle
+            # (images and sounds are left out, see Minesweeper.__getstate__)
             with open(app.pickleFilename, 'wb') as file:
-                # sound files can't be saved, so temporarily set to None
-                app.minesweeper.bombSound = None
-                app.minesweeper.beepSound = None
-                app.minesweeper.victorySound = None   
-                app.minesweeper.flagSound = None    
                 pickle.dump(app.minesweeper, file)
-                # set them back
-                app.minesweeper.bombSound = soundPlay('explosion.mp3')
-                app.minesweeper.beepSound = soundPlay('score.mp3')
-                app.minesweeper.victorySound = soundPlay('victory.mp3')
-                app.minesweeper.flagSound = soundPlay('flag.mp3')
             app.message = "Game saved."
 
 
@@ -344,13 +376,10 @@ def game_onMousePress(app, mouseX, mouseY):
             app.minesweeper.loadTop <= mouseY <= 
             app.minesweeper.loadTop + app.minesweeper.AIBoxHeight):
             # Load the minesweeper state back from the saved file using pickle
+            # (images and sounds come back from the shared asset cache)
             with open(app.pickleFilename, 'rb') as file:
+                app.minesweeper.releaseBitmaps()
                 app.minesweeper = pickle.load(file)
-                # reset the sound files back to original
-                app.minesweeper.bombSound = soundPlay('explosion.mp3')
-                app.minesweeper.beepSound = soundPlay('score.mp3')
-                app.minesweeper.victorySound = soundPlay('victory.mp3')
-                app.minesweeper.flagSound = soundPlay('flag.mp3')
             app.message = "Game loaded."
     
         elif (app.minesweeper.flagBoxLeft <= mouseX <=
@@ -431,6 +460,14 @@ def game_onStep(app):
             file.close()
         app.minesweeper.gameOver = True
         app.gameOver = True
+    # keep the no-guess boards of this size coming
+    if app.noGuessBoards:
+        _, rows, cols, mines = app.boardSize
+        app.boardPool.refill(rows, cols, mines)
+    # while the AI has no safe move, have the worker get its guess ready
+    if (not app.gameOver and app.minesweeper.firstCell != None and 
+        app.minesweeper.AI.makeSafeMove() == None):
+        app.AIWorker.submit(app.minesweeper.AI, app.minesweeper.version)
 
 
 def game_makeAISafeMove(app):
@@ -440,9 +477,12 @@ def game_makeAISafeMove(app):
     return AIcell
 
 def game_makeAIRandomMove(app):
-    # make random move only returns a valid random move (that is, not a 
-    # random move where the AI knows a mine is there.)
-    AIcell = app.minesweeper.AI.makeRandomMove()
+    # the AI guesses the cell that is least likely to be a mine (never a 
+    # cell where the AI knows a mine is there), within its time budget.
+    # use the guess the worker got ready for this board if there is one
+    AIcell = app.AIWorker.getMove(app.minesweeper.AI, app.minesweeper.version)
+    if AIcell == None:
+        AIcell = app.minesweeper.AI.makeMove(app.AITimeBudget)
     return AIcell
         
 def game_onKeyPress(app, key):
@@ -474,8 +514,23 @@ def game_onKeyPress(app, key):
     elif key == 'n' and app.AIGoingRandomMove:
         # don't let the AI make a random move
         app.AIGoingRandomMove = False
+    # scroll and zoom big boards
+    if key == 'left':
+        app.minesweeper.scrollBoard(-100, 0)
+    elif key == 'right':
+        app.minesweeper.scrollBoard(100, 0)
+    elif key == 'up':
+        app.minesweeper.scrollBoard(0, -100)
+    elif key == 'down':
+        app.minesweeper.scrollBoard(0, 100)
+    elif key in ['+', '=']:
+        app.minesweeper.zoomBoard(1.25)
+    elif key == '-':
+        app.minesweeper.zoomBoard(0.8)
 
 def main():
     runAppWithScreens(initialScreen='welcome')
 
-main()
\ No newline at end of file
+# only start the game from the main process, not from the AI's process pool
+if __name__ == '__main__':
+    main()
\ No newline at end of file
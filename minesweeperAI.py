@@ -3,6 +3,12 @@ This file handles the AI agent that makes the best move given the state of the
 game board. 
 """
 import random
+import time
+from collections import deque
+import numpy as np
+from minesweeperSolver import *
+from minesweeperMatrix import *
+from minesweeperPatterns import *
 
 """   
 Citations: (Used these sources to get an idea on how to incorporate AI into the project)
@@ -15,30 +21,131 @@ class Knowledge:
     """
     Knowledge statement about a Minesweeper game that consists of a 
     set of board cells and the count of those cells that are mines. 
+
+    The cells are stored as an integer bitmask over the cell ids 
+    (row * cols + col), shifted so that bit 0 is the smallest id in the 
+    statement. This keeps the mask small on big boards, and makes subset 
+    checks and differences single integer operations.
     """
 
-    def __init__(self, cells, count):
-        self.cells = set(cells)
+    def __init__(self, cells, count, cols):
+        self.cols = cols
+        self.base = 0
+        self.mask = 0
         self.count = count
+        ids = [row * cols + col for row, col in cells]
+        if len(ids):
+            self.base = min(ids)
+            for cellId in ids:
+                self.mask |= 1 << (cellId - self.base)
 
     def __eq__(self, other):
         # sentences are equal when their cells and counts are the same
-        return (isinstance(other, Knowledge) 
-                and self.cells == other.cells and self.count == other.count)
+        return (isinstance(other, Knowledge) and self.base == other.base
+                and self.mask == other.mask and self.count == other.count)
 
     def __repr__(self):
         # return a string of the cells that are mines
         return f"{self.cells}={self.count}"
 
+    @property
+    def cells(self):
+        """
+        Returns the set of (row, col) cells in the statement
+        """
+        cells = set()
+        mask = self.mask
+        while mask:
+            # get the lowest bit and remove it
+            lowestBit = mask & -mask
+            cellId = self.base + lowestBit.bit_length() - 1
+            cells.add((cellId // self.cols, cellId % self.cols))
+            mask ^= lowestBit
+        return cells
+
+    def size(self):
+        """
+        Returns the number of cells in the statement
+        """
+        return self.mask.bit_count()
+
+    def isEmpty(self):
+        """
+        Returns True if the statement has no cells
+        """
+        return not self.mask
+
+    def clear(self):
+        """
+        Removes all the cells and the count of the statement
+        """
+        self.mask = 0
+        self.base = 0
+        self.count = 0
+
+    def key(self):
+        """
+        Returns a hashable key that is the same for equal statements
+        """
+        return (self.base, self.mask, self.count)
+
+    def alignedMask(self, other):
+        """
+        Returns the mask of another statement shifted to line up with the 
+        bits of this statement (bits before this statement's base are 
+        dropped).
+        """
+        if other.base >= self.base:
+            return other.mask << (other.base - self.base)
+        return other.mask >> (self.base - other.base)
+
+    def isSubset(self, other):
+        """
+        Returns True if all the cells of this statement are in the other 
+        statement
+        """
+        if not self.mask:
+            return True
+        if self.base < other.base:
+            return False
+        return other.alignedMask(self) & ~other.mask == 0
+
+    def removeCells(self, other):
+        """
+        Removes the cells of another statement from this statement.
+        """
+        self.mask &= ~self.alignedMask(other)
+        self.normalize()
+
+    def normalize(self):
+        """
+        Shifts the mask so that bit 0 is the smallest cell id again.
+        """
+        if not self.mask:
+            self.base = 0
+            return
+        shift = (self.mask & -self.mask).bit_length() - 1
+        self.mask >>= shift
+        self.base += shift
+
+    def getBit(self, cell):
+        """
+        Returns the bit of a cell in the mask, or 0 if it is out of range
+        """
+        offset = cell[0] * self.cols + cell[1] - self.base
+        if offset < 0:
+            return 0
+        return 1 << offset
+
     def knownMines(self):
         """
         Returns a set of all cells that are known to be mines
         """
         # if the amount of cells in the statement equals the count, 
         # then all the cells are mines
-        if self.count == 0 or not len(self.cells):
+        if self.count == 0 or self.isEmpty():
             return None
-        if len(self.cells) == self.count:
+        if self.size() == self.count:
             return self.cells
         else:
             return None
@@ -58,16 +165,99 @@ class Knowledge:
         Marks a cell as a mine in a knowledge statement.
         Decrement the count of the cells in the statement that are mines. 
         """
-        if cell in self.cells:
-            self.cells.remove(cell)
+        bit = self.getBit(cell)
+        if self.mask & bit:
+            self.mask ^= bit
             self.count -= 1
+            self.normalize()
 
     def markSafe(self, cell):
         """
         Marks a cell as safe in a knowledge statement.
         """
-        if cell in self.cells:
-            self.cells.remove(cell)
+        bit = self.getBit(cell)
+        if self.mask & bit:
+            self.mask ^= bit
+            self.normalize()
+
+
+class SparseKnowledge(Knowledge):
+    """
+    Knowledge statement that stores its cells as a set instead of a 
+    bitmask. The bitmask of a statement spans three rows of the board (up 
+    to 2 * cols + 3 bits), so this is used on boards that are too wide 
+    for it.
+    """
+
+    def __init__(self, cells, count, cols):
+        self.cols = cols
+        self.cellSet = set(cells)
+        self.count = count
+
+    def __eq__(self, other):
+        # sentences are equal when their cells and counts are the same
+        return (isinstance(other, SparseKnowledge) and 
+                self.cellSet == other.cellSet and self.count == other.count)
+
+    @property
+    def cells(self):
+        """
+        Returns the set of (row, col) cells in the statement
+        """
+        return set(self.cellSet)
+
+    def size(self):
+        """
+        Returns the number of cells in the statement
+        """
+        return len(self.cellSet)
+
+    def isEmpty(self):
+        """
+        Returns True if the statement has no cells
+        """
+        return not self.cellSet
+
+    def clear(self):
+        """
+        Removes all the cells and the count of the statement
+        """
+        self.cellSet = set()
+        self.count = 0
+
+    def key(self):
+        """
+        Returns a hashable key that is the same for equal statements
+        """
+        return (frozenset(self.cellSet), self.count)
+
+    def isSubset(self, other):
+        """
+        Returns True if all the cells of this statement are in the other 
+        statement
+        """
+        return self.cellSet <= other.cellSet
+
+    def removeCells(self, other):
+        """
+        Removes the cells of another statement from this statement.
+        """
+        self.cellSet -= other.cellSet
+
+    def markMine(self, cell):
+        """
+        Marks a cell as a mine in a knowledge statement.
+        Decrement the count of the cells in the statement that are mines. 
+        """
+        if cell in self.cellSet:
+            self.cellSet.remove(cell)
+            self.count -= 1
+
+    def markSafe(self, cell):
+        """
+        Marks a cell as safe in a knowledge statement.
+        """
+        self.cellSet.discard(cell)
 
 
 class MinesweeperAI:
@@ -76,7 +266,17 @@ class MinesweeperAI:
     as the game progresses and new Knowledge is attained.
     """
 
-    def __init__(self, rows, cols):
+    # ways the AI can find safe cells and mines: "rules" compares 
+    # overlapping statements, "matrix" row reduces the whole knowledge base
+    strategies = ("rules", "matrix")
+
+    # class of the knowledge statements
+    knowledgeClass = Knowledge
+
+    def __init__(self, rows, cols, mines, strategy="rules"):
+        if strategy not in self.strategies:
+            raise ValueError(f"unknown strategy {strategy!r}")
+        self.strategy = strategy
         
         # Keep track of which cells have been clicked on
         self.movesMade = set()
@@ -85,91 +285,310 @@ class MinesweeperAI:
         self.mines = set()
         self.safes = set()
 
+        # Queue of cells known to be safe that have not been played yet, 
+        # in the order they were found
+        self.safeMoves = deque()
+
         # List of knowledge statements - AI's knowledge base
         self.knowledge = []
+
+        # Index from each cell to the positions in the knowledge base of 
+        # the statements that contain it
+        self.cellIndex = dict()
+
+        # Positions of the knowledge statements that changed and still 
+        # have to be checked for new safes, mines, or overlaps
+        self.changedKnowledge = set()
+
+        # Maps the cells and count of each statement to its position, 
+        # used to find duplicate statements
+        self.knowledgeKeys = dict()
+
+        # Number of statements in the knowledge base that are empty, and 
+        # the number of non-empty statements after every move
+        self.emptyKnowledge = 0
+        self.knowledgeSizes = []
         
-        # Set initial rows and cols
+        # Set initial rows, cols and number of mines
         self.rows = rows
         self.cols = cols
+        self.numberOfMines = mines
+
+        # Cells that random moves are drawn from
+        self.makeCandidates()
+
+        # Count of every cell that has been played minus the known mines 
+        # around it, and whether to look up the patterns of neighboring 
+        # counts before the general engine
+        self.counts = dict()
+        self.usePatterns = True
+
+        # Number of layouts to sample when the chances of the cells being 
+        # mines are too slow to compute exactly
+        self.sampleBudget = 20000
 
     def addKnowledge(self, cell, count):
         """
         Called when the Minesweeper board tells us, for a given
         safe cell, how many neighboring cells have mines in them.
+        """
+        self.addKnowledgeBatch([(cell, count)])
+
+    def addKnowledgeBatch(self, observations):
+        """
+        Called when the Minesweeper board reveals many safe cells at once,
+        such as a flood fill, with a list of (cell, count) for every cell.
+        Inference runs once after all the cells are added.
         
         Follows these steps:
-            1. Marks the cell as a move that has been made
-            2. Marks the cell as safe
-            3. Adds new knowledge statements to knowledge base
-            4. Marks any cells as safe or mines in knowledge base
-            5. Optimizes knowledge by removing subsets.
-            6. Marks cells as safes or mines in knowledge base.
+            1. Marks the cells as moves that have been made
+            2. Marks the cells as safe
+            3. Looks up the patterns the cells form with their neighbors
+            4. Adds new knowledge statements to knowledge base
+            5. Marks cells as safes or mines, and removes subsets, 
+               starting from the statements that changed.
+            6. Compacts the knowledge base.
         """
 
-        # Step 1: Mark the cell as a move that has been made
-        self.movesMade.add(cell)
+        # Step 1: Mark the cells as moves that have been made, so that 
+        # they are not queued (or are dropped from the queue) as safe moves
+        for cell, count in observations:
+            self.movesMade.add(cell)
+            self.removeCandidate(cell)
 
-        # Step 2: Mark the cell as safe
-        self.markSafe(cell)
+        # Step 2: Mark the cells as safe
+        for cell, count in observations:
+            self.markSafe(cell)
 
-        # Step 3: Add new knowledge statements to knowledge base
-        self.appendNewKnowledge(cell, count)
+        # Step 3: Mark the cells forced by the patterns of the counts
+        for cell, count in observations:
+            self.counts[cell] = count - self.countKnownMines(cell)
+        if self.usePatterns:
+            self.applyPatterns([cell for cell, count in observations])
 
-        # Step 4: Mark cells as safe or mines given knowledge base
-        self.markCells()
+        # Step 4: Add new knowledge statements to knowledge base
+        for cell, count in observations:
+            self.appendNewKnowledge(cell, count)
 
-        # Step 5: Optimize the knowledge statements in the Knowledge by 
-        # removing subsets.
-        self.checkForOverlaps()
+        # Step 5: Mark cells as safe or mines and optimize the knowledge 
+        # statements until nothing else can be found
+        self.runInference()
 
-        # Step 6: Mark cells as safe or mines given new knowledge base
-        self.markCells()
+        # Step 6: Remove empty statements if there are too many, and 
+        # record the size of the knowledge base
+        if self.emptyKnowledge > max(32, len(self.knowledge) // 2):
+            self.compactKnowledge()
+        self.knowledgeSizes.append(self.getKnowledgeSize())
 
+    def applyPatterns(self, cells):
+        """
+        This method looks up the pattern of every played cell with each 
+        played cell next to it in a row or column, and marks the cells 
+        the pattern forces to be safe or mines.
+        """
+        for cell in cells:
+            # a pair with a 0 forces nothing that the statement of the 
+            # other cell does not force on its own
+            if self.counts[cell] == 0:
+                continue
+            for neighbor in ((cell[0], cell[1] - 1), (cell[0], cell[1] + 1),
+                             (cell[0] - 1, cell[1]), (cell[0] + 1, cell[1])):
+                if self.counts.get(neighbor, 0) == 0:
+                    continue
+                # look at the pair from its top left cell, transposing 
+                # vertical pairs into horizontal ones
+                first = min(cell, neighbor)
+                if cell[1] == neighbor[1]:
+                    window = [(first[0] + col, first[1] + row) 
+                              for row, col in windowOffsets]
+                else:
+                    window = [(first[0] + row, first[1] + col) 
+                              for row, col in windowOffsets]
+                unknownMask = 0
+                for bit, (row, col) in enumerate(window):
+                    if (0 <= row < self.rows and 0 <= col < self.cols and 
+                        (row, col) not in self.safes and 
+                        (row, col) not in self.mines):
+                        unknownMask |= 1 << bit
+                # nothing can be forced without unknown cells
+                if not unknownMask:
+                    continue
+                key = (unknownMask, self.counts[first], 
+                       self.counts[max(cell, neighbor)])
+                if key not in patternTable:
+                    continue
+                safeMask, mineMask = patternTable[key]
+                for bit, windowCell in enumerate(window):
+                    if safeMask & (1 << bit):
+                        self.markSafe(windowCell)
+                    elif mineMask & (1 << bit) and windowCell not in self.mines:
+                        self.markMine(windowCell)
+
+    def countKnownMines(self, cell):
+        """
+        Returns the number of known mines around a cell.
+        """
+        count = 0
+        for i in range(cell[0] - 1, cell[0] + 2):
+            for j in range(cell[1] - 1, cell[1] + 2):
+                if (i, j) in self.mines:
+                    count += 1
+        return count
+
+    def runInference(self):
+        """
+        This method checks the knowledge statements that changed until 
+        there are none left.
+        Each statement is checked for cells that are known to be safe or 
+        mines, and with the rules strategy, for overlaps with the 
+        statements that share its cells. With the matrix strategy, the 
+        knowledge base is row reduced instead once the changed statements 
+        are checked.
+        Marking a cell or trimming a statement adds the statements it 
+        changed back to the changed set.
+        """
+        while True:
+            # statements checked in this pass, to row reduce afterwards
+            checked = []
+            while self.changedKnowledge:
+                index = self.changedKnowledge.pop()
+                checked.append(index)
+                if self.knowledge[index].isEmpty():
+                    # Skip empty knowledge statements
+                    continue
+                if self.removeDuplicate(index):
+                    continue
+                # if the statement gives safes or mines, the statement is 
+                # now empty, so there are no overlaps to check
+                if not self.markCells(index) and self.strategy == "rules":
+                    self.checkForOverlaps(index)
+            if self.strategy != "matrix" or not self.runElimination(checked):
+                break
+
+    def getConnectedKnowledge(self, indices):
+        """
+        This method returns the statements that share cells with the 
+        statements at the given positions, directly or through other 
+        statements.
+        """
+        visited = set(indices)
+        stack = list(indices)
+        while stack:
+            for cell in self.knowledge[stack.pop()].cells:
+                for index in self.cellIndex.get(cell, ()):
+                    if index not in visited:
+                        visited.add(index)
+                        stack.append(index)
+        return [self.knowledge[index] for index in visited]
+
+    def runElimination(self, indices):
+        """
+        This method row reduces the knowledge statements connected to the 
+        statements at the given positions, and marks the cells that the 
+        reduced statements force to be safe or mines.
+        Returns True if any cells were marked.
+        """
+        knowledge = self.getConnectedKnowledge(indices)
+        safes, mines = findForcedCells(getComponents(knowledge))
+        safes -= self.safes
+        mines -= self.mines
+        for cell in safes:
+            self.markSafe(cell)
+        for cell in mines:
+            self.markMine(cell)
+        return bool(safes or mines)
 
     def markMine(self, cell):
         """
-        Marks a cell as a mine, and updates all knowledge
-        to mark that cell as a mine as well.
+        Marks a cell as a mine, and updates the knowledge that 
+        contains the cell to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for knowledge in self.knowledge:
-            knowledge.markMine(cell)
+        self.removeCandidate(cell)
+        # take the mine out of the counts of the played cells around it
+        for i in range(cell[0] - 1, cell[0] + 2):
+            for j in range(cell[1] - 1, cell[1] + 2):
+                if (i, j) in self.counts:
+                    self.counts[(i, j)] -= 1
+        for index in self.cellIndex.pop(cell, ()):
+            self.knowledge[index].markMine(cell)
+            self.changedKnowledge.add(index)
+            self.countIfEmpty(index)
+
+    def makeCandidates(self):
+        """
+        Stores the ids (row * cols + col) of the cells that have not been 
+        played and are not known to be mines in the first candidateCount 
+        slots, along with the slot of every id, so cells can be removed by 
+        swapping them with the last candidate.
+        """
+        self.candidateIds = np.arange(self.rows * self.cols)
+        self.candidatePositions = np.arange(self.rows * self.cols)
+        self.candidateCount = self.rows * self.cols
+
+    def swapCandidates(self, cellId, position):
+        """
+        Moves the candidate with the given id to the given slot, and the 
+        candidate in that slot to the old slot of the id.
+        """
+        oldPosition = self.candidatePositions[cellId]
+        otherId = self.candidateIds[position]
+        self.candidateIds[position] = cellId
+        self.candidateIds[oldPosition] = otherId
+        self.candidatePositions[cellId] = position
+        self.candidatePositions[otherId] = oldPosition
+
+    def removeCandidate(self, cell):
+        """
+        Removes a cell from the random move candidates, by swapping it with 
+        the last candidate.
+        """
+        cellId = cell[0] * self.cols + cell[1]
+        if self.candidatePositions[cellId] < self.candidateCount:
+            self.candidateCount -= 1
+            self.swapCandidates(cellId, self.candidateCount)
 
     def markSafe(self, cell):
         """
-        Marks a cell as safe, and updates all knowledge
-        to mark that cell as safe as well.
+        Marks a cell as safe, and updates the knowledge that 
+        contains the cell to mark that cell as safe as well.
+        Queues the cell as a safe move if it has not been played yet.
         """
+        if cell not in self.safes and cell not in self.movesMade:
+            self.safeMoves.append(cell)
         self.safes.add(cell)
-        for knowledge in self.knowledge:
-            knowledge.markSafe(cell)
+        for index in self.cellIndex.pop(cell, ()):
+            self.knowledge[index].markSafe(cell)
+            self.changedKnowledge.add(index)
+            self.countIfEmpty(index)
 
-    def markCells(self):
+    def markCells(self, index):
         """
-        This method iterates through all the knowledge in knowledge base.
-        Marks any cells as mines or safes if they can be identified.
+        This method marks the cells of the knowledge statement at the 
+        given position as mines or safes if they can be identified.
+        Returns True if any cells were marked.
         """
-        for knowledge in self.knowledge:
-            # get the retrieved safe cells and mine cells
-            retrievedSafeCells = knowledge.knownSafes()
-            retrievedMineCells = knowledge.knownMines()
-            # iterate through copy of the cells so that we don't modify them
-            if retrievedSafeCells:
-                # iterate and mark/add safe cells
-                for safeCell in retrievedSafeCells.copy():
-                    if safeCell and safeCell not in self.safes:
-                        self.markSafe(safeCell)
-                        self.safes.add(tuple(safeCell))
-            if retrievedMineCells:
-                # iterate and mark/add mine cells
-                for mineCell in retrievedMineCells.copy():
-                    if mineCell and mineCell not in self.mines:
-                        self.markMine(mineCell)
-                        self.mines.add(tuple(mineCell))
+        knowledge = self.knowledge[index]
+        # get the retrieved safe cells and mine cells
+        retrievedSafeCells = knowledge.knownSafes()
+        retrievedMineCells = knowledge.knownMines()
+        # iterate through copy of the cells so that we don't modify them
+        if retrievedSafeCells:
+            # iterate and mark/add safe cells
+            for safeCell in retrievedSafeCells.copy():
+                self.markSafe(safeCell)
+            return True
+        if retrievedMineCells:
+            # iterate and mark/add mine cells
+            for mineCell in retrievedMineCells.copy():
+                self.markMine(mineCell)
+            return True
+        return False
 
     def appendNewKnowledge(self, cell, count):
         """
-        This method adds new knowledge to knowledge.
+        This method adds new knowledge to knowledge, and indexes it by 
+        its cells.
         """
         neighbors = []
         # get all the neighbors that are not yet known
@@ -180,59 +599,142 @@ class MinesweeperAI:
                     continue
                 if (i, j) in self.safes:
                     continue
+                # known mines are taken out of the count
+                if (i, j) in self.mines:
+                    count -= 1
+                    continue
                 neighbors.append((i, j))
         if not len(neighbors):
             return None
         # add new sentence to knowledge
-        newKnowledge = Knowledge(neighbors, count)
-        self.knowledge.append(newKnowledge)
+        newKnowledge = self.knowledgeClass(neighbors, count, self.cols)
+        self.addToIndex(newKnowledge)
+
+    def addToIndex(self, knowledge):
+        """
+        This method appends a knowledge statement to the knowledge base, 
+        indexes it by its cells, and marks it as changed.
+        """
+        index = len(self.knowledge)
+        self.knowledge.append(knowledge)
+        for cell in knowledge.cells:
+            self.cellIndex.setdefault(cell, set()).add(index)
+        self.changedKnowledge.add(index)
 
-    def checkForOverlaps(self):
+    def removeFromIndex(self, index, cells):
         """
-        This method checks for overlapping knowledge statements and optimizes 
+        This method removes the knowledge statement at the given position 
+        from the index of the given cells.
+        """
+        for cell in cells:
+            indices = self.cellIndex.get(cell)
+            if indices != None:
+                indices.discard(index)
+                if not indices:
+                    del self.cellIndex[cell]
+
+    def checkForOverlaps(self, index):
+        """
+        This method checks the knowledge statement at the given position 
+        against the statements that share a cell with it, and optimizes 
         them.
-        If there is an overlap, trim the overlapping knowledge statement by 
-        removing the overlapping part and reduce the mine count.
-        """
-        # initialize index and max length for while loop
-        index = 0 
-        knowledge_length = len(self.knowledge)
-
-        while index < knowledge_length:
-            # get the current knowledge statement
-            currentKnowledge = self.knowledge[index]
-            if not len(currentKnowledge.cells):
-                # Skip empty knowledge statements
-                index += 1  
-                continue
-            # loop over the inner statements
-            inner_index = 0
-            while inner_index < knowledge_length:
-                # skip statements that are the same as current.
-                if inner_index == index:
-                    inner_index += 1
-                    continue
-                # get the subset statements (check if that is a subset)
-                subsetKnowledge = self.knowledge[inner_index]
-                isSubset = self.checkSubset(currentKnowledge.cells, 
-                                            subsetKnowledge.cells)
-                # if there is a subset, we can remove the overlap and the count
-                if isSubset:
-                    for cell in currentKnowledge.cells:
-                        subsetKnowledge.cells.remove(cell)
-                    subsetKnowledge.count -= currentKnowledge.count
-                inner_index += 1
-            index += 1
+        If one statement is a subset of the other, trim the bigger 
+        statement by removing the overlapping part and reduce the mine 
+        count.
+        """
+        currentKnowledge = self.knowledge[index]
+        # get the statements that share at least one cell
+        otherIndices = set()
+        for cell in currentKnowledge.cells:
+            otherIndices |= self.cellIndex[cell]
+        otherIndices.discard(index)
+        for otherIndex in otherIndices:
+            otherKnowledge = self.knowledge[otherIndex]
+            if self.checkSubset(currentKnowledge, otherKnowledge):
+                # trim the other statement
+                self.trimKnowledge(otherIndex, currentKnowledge)
+            elif self.checkSubset(otherKnowledge, currentKnowledge):
+                # trim this statement, and check it again later
+                self.trimKnowledge(index, otherKnowledge)
+                return
+
+    def trimKnowledge(self, index, subsetKnowledge):
+        """
+        This method removes the cells of a subset statement from the 
+        knowledge statement at the given position, and reduces its count.
+        """
+        knowledge = self.knowledge[index]
+        self.removeFromIndex(index, subsetKnowledge.cells)
+        knowledge.removeCells(subsetKnowledge)
+        knowledge.count -= subsetKnowledge.count
+        self.changedKnowledge.add(index)
+        self.countIfEmpty(index)
+
+    def countIfEmpty(self, index):
+        """
+        This method counts the knowledge statement at the given position 
+        as empty if it has no cells left.
+        """
+        if self.knowledge[index].isEmpty():
+            self.emptyKnowledge += 1
+
+    def removeDuplicate(self, index):
+        """
+        This method empties the knowledge statement at the given position 
+        if the knowledge base already has an identical statement.
+        Returns True if the statement was a duplicate.
+        """
+        knowledge = self.knowledge[index]
+        key = knowledge.key()
+        otherIndex = self.knowledgeKeys.get(key)
+        # the saved position is only used if that statement still has 
+        # the same cells and count
+        if (otherIndex != None and otherIndex != index and 
+            self.knowledge[otherIndex] == knowledge):
+            self.removeFromIndex(index, knowledge.cells)
+            knowledge.clear()
+            self.emptyKnowledge += 1
+            return True
+        self.knowledgeKeys[key] = index
+        return False
+
+    def compactKnowledge(self):
+        """
+        This method removes the empty statements from the knowledge base, 
+        and rebuilds the index for the new positions of the statements.
+        """
+        newPositions = dict()
+        newKnowledge = []
+        for index, knowledge in enumerate(self.knowledge):
+            if not knowledge.isEmpty():
+                newPositions[index] = len(newKnowledge)
+                newKnowledge.append(knowledge)
+        self.knowledge = newKnowledge
+        # rebuild the index and the duplicate keys
+        self.cellIndex = dict()
+        self.knowledgeKeys = dict()
+        for index, knowledge in enumerate(self.knowledge):
+            for cell in knowledge.cells:
+                self.cellIndex.setdefault(cell, set()).add(index)
+            self.knowledgeKeys[knowledge.key()] = index
+        self.changedKnowledge = {newPositions[index] 
+                                 for index in self.changedKnowledge
+                                 if index in newPositions}
+        self.emptyKnowledge = 0
+
+    def getKnowledgeSize(self):
+        """
+        This method returns the number of non-empty statements in the 
+        knowledge base.
+        """
+        return len(self.knowledge) - self.emptyKnowledge
             
     def checkSubset(self, inner, outer):
         """
-        This function checks if the provided inner set is a subset of the 
-        provided outer set
+        This function checks if the cells of the provided inner statement 
+        are a subset of the cells of the provided outer statement
         """
-        for elem in inner:
-            if elem not in outer:
-                return False
-        return True
+        return inner.isSubset(outer)
 
     def makeSafeMove(self):
         """
@@ -240,33 +742,170 @@ class MinesweeperAI:
         The move must be known to be safe, and not already a move
         that has been made.
         """
-        # iterate through the rows and columns and find first safe move
-        for i in range(self.rows):
-            for j in range(self.cols):
-                currentMove = (i, j)
-                if (currentMove not in self.movesMade 
-                    and currentMove in self.safes):
-                    return currentMove
+        # drop the queued cells that have been played since they were found
+        while self.safeMoves and self.safeMoves[0] in self.movesMade:
+            self.safeMoves.popleft()
+        # return the first safe move, which stays queued until it is played
+        if self.safeMoves:
+            return self.safeMoves[0]
         # return None if no safe moves can be found
         return None
 
-    def makeRandomMove(self):
+    def makeRandomMove(self, exclude=()):
         """
         Returns a move to make on the Minesweeper board.
         Should choose randomly among cells that have not already been chosen, 
-        and are not known to be mines.
+        and are not known to be mines (or in exclude).
+        Draws from the candidate cells directly, so it never has to retry.
+        """
+        # move the excluded candidates behind the ones that can be drawn
+        count = self.candidateCount
+        for cell in exclude:
+            cellId = cell[0] * self.cols + cell[1]
+            if self.candidatePositions[cellId] < count:
+                count -= 1
+                self.swapCandidates(cellId, count)
+        if count == 0:
+            # Game over. All mines identified.
+            return None
+        # pick a random candidate
+        cellId = int(self.candidateIds[random.randrange(count)])
+        return (cellId // self.cols, cellId % self.cols)
+
+    def estimateMineProbabilities(self, sampleBudget=None, deadline=None):
+        """
+        Returns an estimate of the chance that each unknown cell is a 
+        mine, by sampling mine layouts that agree with the knowledge base.
+        Each chance comes with a lower and upper confidence bound, which 
+        get tighter as the sample budget (or time until the deadline) 
+        grows.
+        """
+        if sampleBudget == None:
+            sampleBudget = self.sampleBudget
+        components, unknownCount, minesLeft = self.getGuessSnapshot()
+        return sampleMineProbabilities(components, unknownCount, minesLeft,
+                                       sampleBudget, deadline=deadline)
+
+    def getGuessSnapshot(self):
+        """
+        Returns what finding the chance of each cell being a mine needs 
+        from the AI: the components of the knowledge base, the number of 
+        unknown cells and the number of mines left.
+        Much cheaper than copying the AI, and shares nothing with it, so 
+        the chances can be found on another thread.
+        """
+        unknownCount = self.rows * self.cols - len(self.safes) - len(self.mines)
+        return (getComponents(self.knowledge), unknownCount, 
+                self.numberOfMines - len(self.mines))
+
+    def makeBestGuess(self, timeBudget=None):
+        """
+        Returns the move least likely to be a mine on the Minesweeper 
+        board, for when no move is known to be safe.
+        Starts with a quick guess from the ratio of mines to cells in each 
+        knowledge statement, then computes the chance of each cell being a 
+        mine from all the statements and the number of mines left, and 
+        estimates the chances by sampling if there are too many layouts 
+        to count.
+        If a time budget (in seconds) is given, returns the best guess 
+        found when it runs out.
         """
-        currentMove = None
-        randomMoveFound = False
-        if len(self.mines) == self.rows * self.cols - len(self.movesMade):
+        deadline = None
+        if timeBudget != None:
+            deadline = time.perf_counter() + timeBudget
+        unknownCount = self.rows * self.cols - len(self.safes) - len(self.mines)
+        if unknownCount == 0:
             # Game over. All mines identified.
             return None
-        while not randomMoveFound:
-            # generate random move 
-            currentMove = (random.randrange(self.rows), 
-                           random.randrange(self.cols))
-            # check if random move is valid
-            if (currentMove not in self.movesMade 
-                and currentMove not in self.mines):
-                randomMoveFound = True
-        return currentMove
\ No newline at end of file
+        minesLeft = self.numberOfMines - len(self.mines)
+        # quick guess that only looks at one statement at a time
+        bestMove = self.pickLeastLikely(*self.getLocalProbabilities(
+                                             unknownCount, minesLeft))
+        if deadline != None and time.perf_counter() > deadline:
+            return bestMove
+        chances = getGuessChances(*self.getGuessSnapshot(), 
+                                  self.sampleBudget, deadline)
+        if chances == None:
+            return bestMove
+        return self.useGuessChances(chances)
+
+    def useGuessChances(self, chances):
+        """
+        Returns the best guess from the chances found by getGuessChances.
+        Exact chances of 0 or 1 are marked as safe cells and mines first, 
+        and a safe move is returned if that found one.
+        """
+        probabilities, otherProbability, exact = chances
+        if exact and self.markCertainCells(probabilities):
+            # the chances showed that some cells are safe or mines
+            move = self.makeSafeMove()
+            if move != None:
+                return move
+            probabilities = {cell: probability 
+                             for cell, probability in probabilities.items() 
+                             if cell not in self.mines}
+        return self.pickLeastLikely(probabilities, otherProbability)
+
+    def markCertainCells(self, probabilities):
+        """
+        Marks the cells with an exact chance of 0 as safe and 1 as mines, 
+        and runs inference on the statements that changed.
+        Returns True if any cells were marked.
+        """
+        marked = False
+        for cell, probability in probabilities.items():
+            if probability == 0:
+                self.markSafe(cell)
+                marked = True
+            elif probability == 1:
+                self.markMine(cell)
+                marked = True
+        if marked:
+            self.runInference()
+        return marked
+
+    def getLocalProbabilities(self, unknownCount, minesLeft):
+        """
+        Returns a rough chance of each frontier cell being a mine, taken as 
+        the highest ratio of mines to cells of the statements it is in, 
+        and the ratio of mines left to unknown cells for the other cells 
+        (None if there are none).
+        """
+        probabilities = dict()
+        for knowledge in self.knowledge:
+            if knowledge.isEmpty():
+                continue
+            ratio = knowledge.count / knowledge.size()
+            for cell in knowledge.cells:
+                probabilities[cell] = max(ratio, probabilities.get(cell, 0))
+        otherProbability = None
+        if unknownCount > len(probabilities):
+            otherProbability = minesLeft / unknownCount
+        return probabilities, otherProbability
+
+    def pickLeastLikely(self, probabilities, otherProbability):
+        """
+        Returns the frontier cell least likely to be a mine, or a random 
+        cell away from the frontier if that is safer.
+        """
+        bestMove = None
+        if probabilities:
+            bestMove = min(probabilities, key=probabilities.get)
+        # guess a cell away from the frontier if that is safer
+        if (otherProbability != None and 
+            (bestMove == None or otherProbability < probabilities[bestMove])):
+            bestMove = self.makeRandomMove(exclude=probabilities)
+        if bestMove == None:
+            bestMove = self.makeRandomMove()
+        return bestMove
+
+    def makeMove(self, timeBudget=None):
+        """
+        Returns the best move the AI can find within the time budget (in 
+        seconds): a move known to be safe if there is one, otherwise the 
+        best guess found before the time runs out.
+        """
+        move = self.makeSafeMove()
+        if move == None:
+            move = self.makeBestGuess(timeBudget)
+        return move
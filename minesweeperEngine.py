@@ -0,0 +1,354 @@
+"""
+This file implements the rules of the Minesweeper game without any drawing.
+Handles board generation, revealing and flagging cells, flood fill and
+win/loss detection, so that games can be simulated without cmu_graphics.
+"""
+import random
+import numpy as np
+from minesweeperAI import *
+
+def countNeighboringMines(mineMask):
+    """
+    This function returns a plane with the number of mines in the 3x3 
+    neighborhood of every cell, given a 2D boolean array of the mines.
+    Sums the 9 shifted copies of the padded mask instead of looping 
+    over every cell.
+    """
+    rows, cols = mineMask.shape
+    padded = np.pad(mineMask.astype(np.int8), 1)
+    countPlane = np.zeros((rows, cols), dtype=np.int8)
+    for rowShift in range(3):
+        for colShift in range(3):
+            countPlane += padded[rowShift:rowShift + rows, 
+                                 colShift:colShift + cols]
+    return countPlane
+
+class MinesweeperEngine:
+    """
+    This class holds the state of a Minesweeper game and applies the rules
+    of the game when cells are revealed or flagged.
+    Does not load any images or sounds, so it can be used headless.
+    """
+    # class of the AI player
+    AIClass = MinesweeperAI
+
+    def __init__(self, rows, cols, mines, strategy="rules", seed=None):
+        # board constants
+        self.rows = rows
+        self.cols = cols
+        self.numberOfMines = mines
+        # seed of the random generator that places the mines, so that the 
+        # same seed and first click always give the same board
+        if seed == None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        # arrays that describe the whole board
+        self.makeBoardArrays()
+        # number of safe cells that have not been clicked yet, the game 
+        # is won when it reaches 0
+        self.safeCellsLeft = self.rows * self.cols - self.numberOfMines
+        # initialize a set of the mines, and cells that have been clicked
+        self.mines = set()
+        self.clickedCells = set()
+        self.floodedCells = set()
+        self.flagCells = set()
+        # cells whose state changed since they were last drawn
+        self.changedCells = set()
+        # number of reveals so far, so that work done for an older board 
+        # can be recognized
+        self.version = 0
+        # game over bool, and the mine that was clicked (if any)
+        self.gameOver = False
+        self.explodedCell = None
+        # AI Class initialized
+        self.AI = self.AIClass(self.rows, self.cols, self.numberOfMines, 
+                               strategy)
+        # first click
+        self.firstCell = None
+        self.initialSafes = set()
+
+    def makeBoardArrays(self):
+        """
+        This function allocates the arrays that describe the whole board.
+        """
+        # initialize a 2D array of the mines, and the count of neighboring 
+        # mines of every cell (computed once the mines are assigned)
+        self.mineMask = np.zeros((self.rows, self.cols), dtype=bool)
+        self.countPlane = np.zeros((self.rows, self.cols), dtype=np.int8)
+        # label of the zero region each cell with a count of 0 belongs to,
+        # and the ids of the cells (and numbered border) of every zero 
+        # region, where the cells of region i are regionCellIds[
+        # regionStarts[i]:regionStarts[i + 1]]
+        self.regionLabels = np.full((self.rows, self.cols), -1, 
+                                    dtype=np.int64)
+        self.regionCellIds = np.zeros(0, dtype=np.int64)
+        self.regionStarts = np.zeros(1, dtype=np.int64)
+        self.borderCellIds = np.zeros(0, dtype=np.int64)
+        self.borderStarts = np.zeros(1, dtype=np.int64)
+
+    def setBoard(self):
+        """
+        This function generates a board with mines, given the first cell was
+        clicked.
+        """
+        # get the neighbors of the first safe cell
+        neighbors = self.getNeighboringCells(self.firstCell)
+        # add the initial cell and all its neighbors to a initial safe set
+        self.initialSafes.add(self.firstCell)
+        for neighbor in neighbors:
+            self.initialSafes.add(neighbor)
+        # randomly assign mines outside of the safe cells.
+        self.assignMines()
+        # floodfill from the first click
+        self.floodFill(self.firstCell)
+
+    def assignMines(self):
+        """
+        This function randomly assigns the designated number of mines on the
+        grid, using the game's seeded random generator.
+        Stores them in the self.mines set and the mine mask, and computes
+        the count plane.
+        """
+        # ids (row * cols + col) of the cells that can hold a mine
+        safeMask = np.zeros((self.rows, self.cols), dtype=bool)
+        for cell in self.initialSafes:
+            safeMask[cell] = True
+        eligibleIds = np.flatnonzero(~safeMask)
+        # pick exactly the number of mines among them, in a single pass
+        chosen = self.rng.sample(range(len(eligibleIds)), self.numberOfMines)
+        mineIds = eligibleIds[chosen]
+        self.mineMask.flat[mineIds] = True
+        self.mines = set(zip((mineIds // self.cols).tolist(), 
+                             (mineIds % self.cols).tolist()))
+        # count the neighboring mines of every cell once
+        self.countPlane = countNeighboringMines(self.mineMask)
+        # find the regions that are opened by clicking a 0
+        self.labelZeroRegions()
+
+    def labelZeroRegions(self):
+        """
+        This function labels every connected region of cells with a count 
+        of 0, and finds the numbered cells on the border of each region.
+        Called once when the board is generated, so that opening a region 
+        later does not need to search the board.
+        Works on whole arrays instead of searching cell by cell: the zero 
+        cells of every row are grouped into runs, and runs that touch are 
+        joined with a vectorized union-find.
+        """
+        zeroMask = (self.countPlane == 0) & ~self.mineMask
+        # number the runs of zero cells in every row
+        runStarts = zeroMask.copy()
+        runStarts[:, 1:] &= ~zeroMask[:, :-1]
+        runIds = np.cumsum(runStarts).reshape(zeroMask.shape) - 1
+        runCount = int(runStarts.sum())
+        # runs in neighboring rows touch if any of their cells touch
+        below, above = zeroMask[1:], zeroMask[:-1]
+        runsBelow, runsAbove = runIds[1:], runIds[:-1]
+        edgesA, edgesB = [], []
+        for belowCols, aboveCols in [(slice(None), slice(None)), 
+                                     (slice(1, None), slice(None, -1)), 
+                                     (slice(None, -1), slice(1, None))]:
+            touching = below[:, belowCols] & above[:, aboveCols]
+            edgesA.append(runsBelow[:, belowCols][touching])
+            edgesB.append(runsAbove[:, aboveCols][touching])
+        edgesA, edgesB = np.concatenate(edgesA), np.concatenate(edgesB)
+        # union-find: every run points to the smallest run it was joined to
+        parents = np.arange(runCount)
+        while True:
+            rootsA, rootsB = parents[edgesA], parents[edgesB]
+            unjoined = rootsA != rootsB
+            if not unjoined.any():
+                break
+            edgesA, edgesB = edgesA[unjoined], edgesB[unjoined]
+            rootsA, rootsB = rootsA[unjoined], rootsB[unjoined]
+            # hook the larger root of every edge under the smaller one
+            np.minimum.at(parents, np.maximum(rootsA, rootsB), 
+                          np.minimum(rootsA, rootsB))
+            # point every run straight at its root
+            while True:
+                grandParents = parents[parents]
+                if (grandParents == parents).all():
+                    break
+                parents = grandParents
+        # number the regions from 0 in the order of their roots, and 
+        # label their cells
+        isRoot = parents == np.arange(runCount)
+        regionCount = int(isRoot.sum())
+        runLabels = (np.cumsum(isRoot) - 1)[parents]
+        self.regionLabels.fill(-1)
+        self.regionLabels[zeroMask] = runLabels[runIds[zeroMask]]
+        # ids of the cells of every region, sorted by region
+        labels = self.regionLabels.ravel()
+        zeroIds = np.flatnonzero(zeroMask)
+        order = np.argsort(labels[zeroIds], kind='stable')
+        self.regionCellIds = zeroIds[order]
+        self.regionStarts = np.searchsorted(labels[self.regionCellIds], 
+                                            np.arange(regionCount + 1))
+        # ids of the numbered cells around every region, sorted by region
+        cellCount = self.rows * self.cols
+        padded = np.pad(self.regionLabels, 1, constant_values=-1)
+        borderKeys = []
+        for rowShift in range(3):
+            for colShift in range(3):
+                neighborLabels = padded[rowShift:rowShift + self.rows, 
+                                        colShift:colShift + self.cols]
+                # numbered cells next to a region
+                bordering = (neighborLabels != -1) & ~zeroMask
+                borderKeys.append(neighborLabels[bordering].astype(np.int64)
+                                  * cellCount + np.flatnonzero(bordering))
+        # sort the (region, cell) keys and drop the repeated ones
+        borderKeys = np.sort(np.concatenate(borderKeys))
+        borderKeys = borderKeys[np.diff(borderKeys, prepend=-1) != 0]
+        self.borderCellIds = borderKeys % cellCount
+        self.borderStarts = np.searchsorted(borderKeys // cellCount, 
+                                            np.arange(regionCount + 1))
+
+    def getCellsFromIds(self, cellIds):
+        # turn an array of ids (row * cols + col) into a set of cells
+        return set(zip((cellIds // self.cols).tolist(), 
+                       (cellIds % self.cols).tolist()))
+
+    def getNeighboringMineCount(self, cell):
+        """
+        This function gets the number of neighboring cells that are mines.
+        Takes in a current cell in tuple (row, col) as an argument.
+        """
+        # look up the count computed when the mines were assigned
+        return int(self.countPlane[cell])
+
+    def getNeighboringCells(self, cell):
+        """
+        Helper function that returns a list of all the neighbors of a cell.
+        Takes in a specific given by (row, col) as input.
+        """
+        # iterate through all the cell's neighbors
+        # add to list if valid cell
+        neighbors = []
+        # iterate through all possible combinations of drow and col
+        for examinedRow in range(cell[0] - 1, cell[0] + 2):
+            for examinedCol in range(cell[1] - 1, cell[1] + 2):
+                # check if the neighbor is a valid neighbor and append to list
+                if ((0 <= examinedRow < self.rows)
+                    and (0 <= examinedCol < self.cols)):
+                        neighbors.append((examinedRow, examinedCol))
+        return neighbors
+
+    def floodFill(self, cell):
+        """
+        This function is called when a specific cell is revealed,
+        and has a count of 0.
+        Opens the whole precomputed zero region of the cell, along with the 
+        numbered cells on its border, and adds them to the AI's knowledge.
+        Takes in a specific cell given by (row, col) as input.
+        """
+        # if the cell is in the flooded set, return without doing anything.
+        if cell in self.floodedCells:
+            return
+        label = self.regionLabels[cell]
+        region = self.regionCellIds[self.regionStarts[label]:
+                                    self.regionStarts[label + 1]]
+        border = self.borderCellIds[self.borderStarts[label]:
+                                    self.borderStarts[label + 1]]
+        self.openRegion(self.getCellsFromIds(region), 
+                        self.getCellsFromIds(border))
+
+    def openRegion(self, region, border):
+        """
+        This function opens a region of cells with a count of 0, along with
+        the numbered cells on its border, and adds them to the AI's 
+        knowledge.
+        """
+        # add the cells that were not clicked yet to the AI's knowledge, 
+        # all at once so that it only runs inference once
+        newCells = (region | border) - self.clickedCells
+        self.AI.addKnowledgeBatch([(newCell, 
+                                    self.getNeighboringMineCount(newCell))
+                                   for newCell in newCells])
+        self.safeCellsLeft -= len(newCells)
+        # add the region to the flooded and clicked sets
+        self.floodedCells |= region
+        self.clickedCells |= region
+        self.clickedCells |= border
+        self.changedCells |= region
+        self.changedCells |= border
+
+    def reveal(self, cell):
+        """
+        This function reveals a cell given by (row, col).
+        The first reveal generates the board around that cell.
+        Revealing a mine ends the game, revealing a 0 floods its neighbors,
+        and any other safe cell is added to the AI's knowledge.
+        Returns True if the cell was a mine, False otherwise.
+        """
+        if self.gameOver:
+            return False
+        self.version += 1
+        # a revealed cell can no longer be flagged
+        self.flagCells.discard(cell)
+        self.changedCells.add(cell)
+        # check if the click was the first click
+        if self.firstCell == None:
+            self.firstCell = cell
+            # add to the AI's knowledge
+            self.AI.addKnowledge(cell, 0)
+            # add to clicked cells and generate the board
+            self.clickedCells.add(cell)
+            self.safeCellsLeft -= 1
+            self.setBoard()
+            return False
+        if cell in self.mines:
+            # add cell to clicked
+            self.clickedCells.add(cell)
+            self.gameOver = True
+            self.explodedCell = cell
+            return True
+        count = self.getNeighboringMineCount(cell)
+        if count == 0:
+            self.floodFill(cell)
+        else:
+            self.AI.addKnowledge(cell, count)
+            # add cell to clicked
+            if cell not in self.clickedCells:
+                self.clickedCells.add(cell)
+                self.safeCellsLeft -= 1
+        return False
+
+    def flag(self, cell):
+        """
+        This function toggles a flag on a cell given by (row, col).
+        Returns True if a flag was placed, False if one was removed.
+        """
+        self.changedCells.add(cell)
+        if cell in self.flagCells:
+            self.flagCells.remove(cell)
+            return False
+        self.flagCells.add(cell)
+        return True
+
+    def checkWin(self):
+        """
+        This function checks if we have won the game.
+        Game is won if all the safe cells have been clicked, without 
+        clicking a mine.
+        """
+        # return True if the win condition is satisfied
+        return self.safeCellsLeft == 0 and self.explodedCell == None
+
+def playAIGame(rows, cols, mines, strategy="rules", timeBudget=None, 
+               seed=None):
+    """
+    This function plays a full game using only the AI's moves, making the
+    safest guess whenever no safe move is known.
+    The AI finds safe cells and mines with the given strategy, and spends 
+    at most the time budget (in seconds, if given) on each guess. The 
+    board is generated from the seed, if given.
+    Returns True if the AI won the game.
+    """
+    engine = MinesweeperEngine(rows, cols, mines, strategy, seed)
+    while not engine.gameOver and not engine.checkWin():
+        move = engine.AI.makeMove(timeBudget)
+        if move == None:
+            break
+        engine.reveal(move)
+    return engine.checkWin()
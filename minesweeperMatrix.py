@@ -0,0 +1,117 @@
+"""
+This file finds safe cells and mines by row reducing the matrix of the AI's
+knowledge statements, where every statement is a row saying that the sum of
+its cells (1 for a mine) equals its count.
+"""
+import math
+
+def reduceRow(row, rhs):
+    """
+    This function divides a row and its right hand side by the greatest
+    common divisor of all of them, so the numbers stay small.
+    Takes in a row as a dict of column to coefficient.
+    Returns the reduced row and right hand side.
+    """
+    divisor = abs(rhs)
+    for coefficient in row.values():
+        divisor = math.gcd(divisor, coefficient)
+    if divisor > 1:
+        row = {column: coefficient // divisor
+               for column, coefficient in row.items()}
+        rhs //= divisor
+    return row, rhs
+
+def rowReduce(rows):
+    """
+    This function row reduces a list of (row, rhs) equations with integer
+    coefficients, where every row is a dict of column to coefficient.
+    Eliminates with integer combinations of rows instead of fractions, so
+    the result is exact.
+    Returns the list of reduced equations that are not empty.
+    """
+    rows = [(dict(row), rhs) for row, rhs in rows]
+    pivotRows = []
+    for row, rhs in rows:
+        # eliminate the pivots found so far from the row
+        for pivotColumn, pivotRow, pivotRhs in pivotRows:
+            if pivotColumn not in row:
+                continue
+            row, rhs = eliminate(row, rhs, pivotColumn, pivotRow, pivotRhs)
+        if not row:
+            continue
+        pivotColumn = min(row)
+        # eliminate the new pivot from the pivot rows above it
+        for index, (otherColumn, otherRow, otherRhs) in enumerate(pivotRows):
+            if pivotColumn in otherRow:
+                otherRow, otherRhs = eliminate(otherRow, otherRhs,
+                                               pivotColumn, row, rhs)
+                pivotRows[index] = (otherColumn, otherRow, otherRhs)
+        pivotRows.append((pivotColumn, row, rhs))
+    return [(row, rhs) for pivotColumn, row, rhs in pivotRows]
+
+def eliminate(row, rhs, column, pivotRow, pivotRhs):
+    """
+    Helper function for rowReduce, removes a column from a row by
+    subtracting a multiple of the pivot row.
+    Returns the new row and right hand side.
+    """
+    scale = pivotRow[column]
+    factor = row[column]
+    newRow = {otherColumn: coefficient * scale
+              for otherColumn, coefficient in row.items()}
+    for otherColumn, coefficient in pivotRow.items():
+        value = newRow.get(otherColumn, 0) - coefficient * factor
+        if value:
+            newRow[otherColumn] = value
+        else:
+            newRow.pop(otherColumn, None)
+    newRhs = rhs * scale - pivotRhs * factor
+    # keep the pivot positive so the rows are easier to read
+    if scale < 0:
+        newRow = {otherColumn: -coefficient
+                  for otherColumn, coefficient in newRow.items()}
+        newRhs = -newRhs
+    return reduceRow(newRow, newRhs)
+
+def checkBounds(row, rhs):
+    """
+    This function checks if an equation can only be satisfied one way.
+    Since every cell is 0 or 1, the left hand side is at least the sum of
+    the negative coefficients and at most the sum of the positive ones.
+    Returns a list of (column, value) for the columns it forces, which is
+    empty if it forces none.
+    """
+    largest = sum(coefficient for coefficient in row.values()
+                  if coefficient > 0)
+    smallest = sum(coefficient for coefficient in row.values()
+                   if coefficient < 0)
+    if rhs == largest:
+        # every positive cell is a mine and every negative cell is safe
+        return [(column, int(coefficient > 0))
+                for column, coefficient in row.items()]
+    if rhs == smallest:
+        # every negative cell is a mine and every positive cell is safe
+        return [(column, int(coefficient < 0))
+                for column, coefficient in row.items()]
+    return []
+
+def findForcedCells(components):
+    """
+    This function row reduces the constraints of every component, and
+    checks the reduced rows for cells that can only be mines or safe.
+    Takes in a list of (cells, constraints), where each constraint is
+    (list of positions in cells, count).
+    Returns a set of safe cells and a set of mines.
+    """
+    safes = set()
+    mines = set()
+    for cells, constraints in components:
+        rows = [({position: 1 for position in positions}, count)
+                for positions, count in constraints]
+        for row, rhs in rowReduce(rows):
+            for position, value in checkBounds(row, rhs):
+                if value:
+                    mines.add(cells[position])
+                else:
+                    safes.add(cells[position])
+    return safes, mines
@@ -0,0 +1,114 @@
+"""
+This file holds a table of the small patterns (like 1-1 and 1-2) that two
+neighboring numbers form, and the safe cells and mines each pattern forces.
+The table is generated offline by generatePatterns.py, and loaded once when
+this file is imported.
+
+A pattern is looked at from a pair of revealed cells A and B next to each
+other in a row, B to the right of A. The 10 other cells around them are
+numbered row by row:
+
+     0  1  2  3
+     4  A  B  5
+     6  7  8  9
+
+A pattern is a bitmask of which of these cells are unknown, along with the
+counts of A and B minus the mines around them that are already known.
+Vertical pairs are transposed to look like horizontal ones.
+"""
+import os
+
+# (row, col) offsets of the window cells from A, in bit order
+windowOffsets = [(-1, -1), (-1, 0), (-1, 1), (-1, 2),
+                 (0, -1), (0, 2),
+                 (1, -1), (1, 0), (1, 1), (1, 2)]
+
+patternsPath = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            'patterns.txt')
+
+def isNextToA(offset):
+    """
+    This function checks if a window cell (given by its offset from A) is
+    one of A's neighbors.
+    """
+    return offset[1] <= 1
+
+def isNextToB(offset):
+    """
+    This function checks if a window cell (given by its offset from A) is
+    one of B's neighbors.
+    """
+    return offset[1] >= 0
+
+def getWindowSymmetries():
+    """
+    This function returns the symmetries of the window as a list of
+    (bit permutation, swapsCounts), where the permutation maps each bit to
+    its new bit, and swapsCounts is True if A and B trade places.
+    Covers flipping the rows, flipping the columns, and both.
+    """
+    symmetries = []
+    for flipRows in (False, True):
+        for flipCols in (False, True):
+            permutation = []
+            for row, col in windowOffsets:
+                if flipRows:
+                    row = -row
+                if flipCols:
+                    col = 1 - col
+                permutation.append(windowOffsets.index((row, col)))
+            symmetries.append((permutation, flipCols))
+    return symmetries
+
+def permuteMask(mask, permutation):
+    """
+    This function moves every bit of a window mask to its new position.
+    """
+    result = 0
+    for bit, newBit in enumerate(permutation):
+        if mask & (1 << bit):
+            result |= 1 << newBit
+    return result
+
+def transformPattern(pattern, symmetry):
+    """
+    This function applies a symmetry to a pattern given as
+    (unknown mask, count of A, count of B), along with the safe and mine
+    masks it forces.
+    """
+    (unknownMask, countA, countB), (safeMask, mineMask) = pattern
+    permutation, swapsCounts = symmetry
+    if swapsCounts:
+        countA, countB = countB, countA
+    return ((permuteMask(unknownMask, permutation), countA, countB),
+            (permuteMask(safeMask, permutation),
+             permuteMask(mineMask, permutation)))
+
+def loadPatterns(path=patternsPath):
+    """
+    This function reads the pattern file, where every line is a pattern in
+    its canonical form as the hex unknown mask, the two counts, and the hex
+    safe and mine masks.
+    Adds every symmetry of each pattern, so that looking up a pattern is a
+    single dictionary lookup.
+    Returns a dict of (unknown mask, count of A, count of B) to
+    (safe mask, mine mask), which is empty if the file is missing.
+    """
+    table = dict()
+    if not os.path.exists(path):
+        return table
+    symmetries = getWindowSymmetries()
+    with open(path) as patternsFile:
+        for line in patternsFile:
+            if not line.strip() or line.startswith('#'):
+                continue
+            unknownMask, countA, countB, safeMask, mineMask = line.split()
+            pattern = ((int(unknownMask, 16), int(countA), int(countB)),
+                       (int(safeMask, 16), int(mineMask, 16)))
+            for symmetry in symmetries:
+                key, forced = transformPattern(pattern, symmetry)
+                table[key] = forced
+    return table
+
+# the table is loaded once, when the AI is first imported
+patternTable = loadPatterns()
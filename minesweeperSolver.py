@@ -0,0 +1,596 @@
+"""
+This file finds the chance that each unknown cell is a mine, given the AI's
+knowledge base, so that the AI can make the safest possible guess when no
+move is known to be safe.
+"""
+import math
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+import numpy as np
+
+# process pool for solving components in parallel, made the first time it
+# is needed (under the lock, since the AI worker thread can ask for it
+# too), and the least number of components and frontier cells worth
+# sending to it
+processPool = None
+processPoolLock = threading.Lock()
+parallelComponents = 8
+parallelCells = 400
+
+def findRoot(parents, index):
+    """
+    Helper function for getComponents, finds the root of a group of
+    statements (with path halving).
+    """
+    while parents[index] != index:
+        parents[index] = parents[parents[index]]
+        index = parents[index]
+    return index
+
+def getComponents(knowledge):
+    """
+    This function splits the knowledge statements into groups that do not
+    share any cells, since the mines in one group don't affect the others.
+    Returns a list of (cells, constraints) for every group, where each
+    constraint is (list of positions in cells, count).
+    """
+    statements = [(statement.cells, statement.count)
+                  for statement in knowledge if not statement.isEmpty()]
+    # join statements that share a cell
+    parents = list(range(len(statements)))
+    cellOwners = dict()
+    for index, (cells, count) in enumerate(statements):
+        for cell in cells:
+            if cell in cellOwners:
+                parents[findRoot(parents, index)] = findRoot(parents,
+                                                        cellOwners[cell])
+            else:
+                cellOwners[cell] = index
+    groups = dict()
+    for index in range(len(statements)):
+        groups.setdefault(findRoot(parents, index), []).append(index)
+    # number the cells of every group
+    components = []
+    for indices in groups.values():
+        cells = sorted(set().union(*[statements[index][0]
+                                     for index in indices]))
+        positions = {cell: position for position, cell in enumerate(cells)}
+        constraints = []
+        for index in indices:
+            cellsInStatement, count = statements[index]
+            constraints.append(([positions[cell]
+                                 for cell in cellsInStatement], count))
+        components.append((cells, constraints))
+    return components
+
+class ComponentSolver:
+    """
+    This class enumerates every assignment of mines to the cells of a
+    component that satisfies all of its constraints.
+    Backtracks as soon as a constraint has too many mines, or not enough
+    cells left to reach its count.
+    """
+    # number of assignments to try before giving up
+    maxNodes = 200000
+
+    def __init__(self, cells, constraints, maxMines, deadline=None):
+        self.cells = cells
+        self.constraints = constraints
+        self.maxMines = maxMines
+        self.deadline = deadline
+        # constraints that each cell is in
+        self.cellConstraints = [[] for cell in cells]
+        for index, (positions, count) in enumerate(constraints):
+            for position in positions:
+                self.cellConstraints[position].append(index)
+        # order the cells so that constraints are completed early
+        self.order = self.getCellOrder()
+        # mines and unassigned cells in each constraint so far
+        self.minesIn = [0] * len(constraints)
+        self.unassigned = [len(positions) for positions, count in constraints]
+        self.assignment = [0] * len(cells)
+        self.mineCount = 0
+        # maps number of mines to [solutions, mines in each cell]
+        self.results = dict()
+        self.nodes = 0
+        self.gaveUp = False
+
+    def getCellOrder(self):
+        """
+        This method orders the cells by walking through the constraints
+        from the first cell, so that neighboring cells are assigned
+        together.
+        """
+        order = []
+        visited = [False] * len(self.cells)
+        for start in range(len(self.cells)):
+            if visited[start]:
+                continue
+            visited[start] = True
+            queue = [start]
+            while queue:
+                position = queue.pop(0)
+                order.append(position)
+                for index in self.cellConstraints[position]:
+                    for other in self.constraints[index][0]:
+                        if not visited[other]:
+                            visited[other] = True
+                            queue.append(other)
+        return order
+
+    def solve(self):
+        """
+        This method runs the search.
+        Returns the results, or None if the search took too long.
+        """
+        self.search()
+        if self.gaveUp:
+            return None
+        return self.results
+
+    def canAssign(self, position, value):
+        """
+        This method checks if a cell can be given a value (1 for a mine)
+        without breaking any of its constraints.
+        """
+        for index in self.cellConstraints[position]:
+            mines = self.minesIn[index] + value
+            count = self.constraints[index][1]
+            if mines > count or mines + self.unassigned[index] - 1 < count:
+                return False
+        return True
+
+    def assign(self, position, value, change):
+        """
+        This method assigns (change = 1) or unassigns (change = -1) a
+        value to a cell.
+        """
+        for index in self.cellConstraints[position]:
+            self.minesIn[index] += value * change
+            self.unassigned[index] -= change
+        self.assignment[position] = value if change == 1 else 0
+        self.mineCount += value * change
+
+    def search(self):
+        """
+        This method assigns the cells in order with a depth-first search,
+        and records every complete assignment.
+        Keeps the values assigned so far on a stack instead of recursing,
+        since a component can have more cells than the recursion limit.
+        """
+        # values assigned to the cells of the order so far, and the next
+        # value to try for the cell at the current depth
+        values = []
+        nextValue = 0
+        while True:
+            depth = len(values)
+            if nextValue == 0:
+                # a new node of the search
+                self.nodes += 1
+                if self.nodes > self.maxNodes:
+                    self.gaveUp = True
+                elif (self.deadline != None and self.nodes % 1024 == 0 and
+                      time.perf_counter() > self.deadline):
+                    self.gaveUp = True
+                if self.gaveUp:
+                    return
+            assigned = False
+            if depth == len(self.order):
+                # record the solution
+                if self.mineCount not in self.results:
+                    self.results[self.mineCount] = [0, [0] * len(self.cells)]
+                result = self.results[self.mineCount]
+                result[0] += 1
+                for position in range(len(self.cells)):
+                    result[1][position] += self.assignment[position]
+            else:
+                position = self.order[depth]
+                for value in range(nextValue, 2):
+                    if value == 1 and self.mineCount >= self.maxMines:
+                        continue
+                    if self.canAssign(position, value):
+                        self.assign(position, value, 1)
+                        values.append(value)
+                        nextValue = 0
+                        assigned = True
+                        break
+            if not assigned:
+                # go back to the last cell, and try its next value
+                if not values:
+                    return
+                value = values.pop()
+                self.assign(self.order[len(values)], value, -1)
+                nextValue = value + 1
+
+def solveComponent(cells, constraints, maxMines, wallDeadline=None):
+    """
+    This function solves one component, and is what the process pool runs.
+    Takes a time.time() deadline instead of a time.perf_counter() one, 
+    since time.perf_counter() of other processes may not match. The same
+    deadline is shared by every component of a call, so that a chunk of
+    components can't take longer than the time budget of the call.
+    Returns the results of the solver, or None if it gave up.
+    """
+    deadline = None
+    if wallDeadline != None:
+        timeLeft = wallDeadline - time.time()
+        if timeLeft <= 0:
+            return None
+        deadline = time.perf_counter() + timeLeft
+    return ComponentSolver(cells, constraints, maxMines, deadline).solve()
+
+def getProcessPool():
+    """
+    This function returns the process pool, making it the first time.
+    Returns None if there is only one core, since a pool would not help.
+    """
+    global processPool
+    with processPoolLock:
+        if processPool == None and (os.cpu_count() or 1) > 1:
+            processPool = ProcessPoolExecutor()
+    return processPool
+
+def solveComponents(components, maxMines, deadline=None):
+    """
+    This function solves every component, on the process pool if there
+    are enough components and cells to be worth it.
+    Returns a list of the results of every component (None for the ones
+    that could not be solved in time).
+    """
+    frontierCount = sum(len(cells) for cells, constraints in components)
+    pool = None
+    if (len(components) >= parallelComponents and
+        frontierCount >= parallelCells):
+        pool = getProcessPool()
+    if pool == None:
+        allResults = []
+        for cells, constraints in components:
+            # small components finish before the solver checks the time
+            if deadline != None and time.perf_counter() > deadline:
+                return allResults + [None] * (len(components) - 
+                                              len(allResults))
+            allResults.append(ComponentSolver(cells, constraints, maxMines,
+                                              deadline).solve())
+        return allResults
+    timeBudget = None
+    wallDeadline = None
+    if deadline != None:
+        timeBudget = max(0.0, deadline - time.perf_counter())
+        wallDeadline = time.time() + timeBudget
+    # send the components in a few large chunks to save on messages
+    chunkSize = max(1, len(components) // (4 * (os.cpu_count() or 1)))
+    allResults = []
+    try:
+        for results in pool.map(solveComponent,
+                                [cells for cells, constraints in components],
+                                [constraints 
+                                 for cells, constraints in components],
+                                [maxMines] * len(components),
+                                [wallDeadline] * len(components),
+                                timeout=timeBudget, chunksize=chunkSize):
+            allResults.append(results)
+    except TimeoutError:
+        # map cancels the chunks that have not started, and the running
+        # ones stop at the shared deadline
+        pass
+    return allResults + [None] * (len(components) - len(allResults))
+
+def convolve(first, second):
+    """
+    This function combines two lists of weights indexed by number of
+    mines, giving the weights of the total number of mines.
+    The result is scaled so that its largest weight is 1.
+    """
+    result = [0.0] * (len(first) + len(second) - 1)
+    for i, firstWeight in enumerate(first):
+        if firstWeight == 0:
+            continue
+        for j, secondWeight in enumerate(second):
+            result[i + j] += firstWeight * secondWeight
+    largest = max(result)
+    if largest > 0:
+        result = [weight / largest for weight in result]
+    return result
+
+def getOtherCellWeights(otherCount, minesLeft, maxFrontierMines):
+    """
+    This function returns, for every number of mines K on the frontier,
+    the number of ways to place the other minesLeft - K mines in the cells
+    that are not on the frontier, scaled so that the largest weight is 1.
+    """
+    logWeights = []
+    for frontierMines in range(maxFrontierMines + 1):
+        otherMines = minesLeft - frontierMines
+        if 0 <= otherMines <= otherCount:
+            logWeights.append(math.lgamma(otherCount + 1) -
+                              math.lgamma(otherMines + 1) -
+                              math.lgamma(otherCount - otherMines + 1))
+        else:
+            logWeights.append(None)
+    largest = max([weight for weight in logWeights if weight != None],
+                  default=None)
+    if largest == None:
+        return [0.0] * len(logWeights)
+    return [0.0 if weight == None else math.exp(weight - largest)
+            for weight in logWeights]
+
+def combineComponents(solvedComponents, otherCount, minesLeft, 
+                      deadline=None):
+    """
+    This function weights the solutions of every component by the number
+    of ways to place the remaining mines in the cells that are not on the
+    frontier.
+    Takes in a list of (cells, results) for every component and an
+    optional time.perf_counter() deadline.
+    Returns a dict of the chance that each frontier cell is a mine, and
+    the chance for the other unknown cells (None if there are none), or
+    None if the deadline passed first.
+    """
+    # weights of each component by number of mines
+    weights = []
+    for cells, results in solvedComponents:
+        componentWeights = [0.0] * (max(results) + 1)
+        for mines, (solutions, cellMines) in results.items():
+            componentWeights[mines] = float(solutions)
+        weights.append(componentWeights)
+    # weights of all the components before and after each component
+    before = [[1.0]]
+    for componentWeights in weights:
+        if deadline != None and time.perf_counter() > deadline:
+            return None
+        before.append(convolve(before[-1], componentWeights))
+    after = [[1.0]]
+    for componentWeights in reversed(weights):
+        if deadline != None and time.perf_counter() > deadline:
+            return None
+        after.append(convolve(after[-1], componentWeights))
+    after.reverse()
+    otherWeights = getOtherCellWeights(otherCount, minesLeft,
+                                       len(before[-1]) - 1)
+    probabilities = dict()
+    for index, (cells, results) in enumerate(solvedComponents):
+        if deadline != None and time.perf_counter() > deadline:
+            return None
+        rest = convolve(before[index], after[index + 1])
+        total = 0.0
+        cellTotals = [0.0] * len(cells)
+        for mines, (solutions, cellMines) in results.items():
+            # weight of the other components and other cells
+            weight = sum(restWeight * otherWeights[mines + restMines]
+                         for restMines, restWeight in enumerate(rest))
+            total += solutions * weight
+            for position in range(len(cells)):
+                cellTotals[position] += cellMines[position] * weight
+        for position, cell in enumerate(cells):
+            if total > 0:
+                probabilities[cell] = cellTotals[position] / total
+    # expected number of mines left for the other cells
+    otherProbability = None
+    if otherCount > 0:
+        total = 0.0
+        expectedMines = 0.0
+        for frontierMines, weight in enumerate(before[-1]):
+            weight *= otherWeights[frontierMines]
+            total += weight
+            expectedMines += weight * (minesLeft - frontierMines)
+        if total > 0:
+            otherProbability = expectedMines / total / otherCount
+    return probabilities, otherProbability
+
+def getMineProbabilities(components, unknownCount, minesLeft, deadline=None):
+    """
+    This function computes the chance that each unknown cell is a mine.
+    Takes in the components of the knowledge base (from getComponents),
+    the number of unknown cells, the number of mines that are not known
+    yet, and an optional time.perf_counter() deadline.
+    Returns a dict of the chance for every frontier cell and the chance
+    for the other unknown cells, or None if the components could not be
+    solved and combined in time.
+    """
+    allResults = solveComponents(components, minesLeft, deadline)
+    solvedComponents = []
+    frontierCount = 0
+    for (cells, constraints), results in zip(components, allResults):
+        if results == None or not results:
+            return None
+        solvedComponents.append((cells, results))
+        frontierCount += len(cells)
+    return combineComponents(solvedComponents, unknownCount - frontierCount,
+                             minesLeft, deadline)
+
+class LayoutSampler:
+    """
+    This class draws batches of random mine layouts for the frontier cells
+    that satisfy all of the constraints, for when there are too many
+    layouts to enumerate.
+    Every sample assigns the cells one at a time, forcing a cell whenever
+    a constraint needs it, and otherwise guessing with the share of mines
+    its constraints still need.
+    Each layout is weighted by how likely it is over how likely it was to
+    be drawn, so that the weighted samples give unbiased chances.
+    """
+    def __init__(self, cells, constraints, otherCount, minesLeft, rng=None):
+        self.cells = cells
+        self.otherCount = otherCount
+        self.minesLeft = minesLeft
+        self.rng = np.random.default_rng() if rng == None else rng
+        self.counts = np.array([count for positions, count in constraints],
+                               dtype=np.int32)
+        self.sizes = np.array([len(positions) 
+                               for positions, count in constraints],
+                              dtype=np.int32)
+        # reuse the solver's ordering so constraints are completed early
+        solver = ComponentSolver(cells, constraints, minesLeft)
+        self.order = solver.getCellOrder()
+        self.cellConstraints = [np.array(indices, dtype=np.int32) 
+                                for indices in solver.cellConstraints]
+        # log of the ways to place the other mines, by frontier mines
+        self.logOtherWeights = np.full(len(cells) + 1, -np.inf)
+        for frontierMines in range(len(cells) + 1):
+            otherMines = minesLeft - frontierMines
+            if 0 <= otherMines <= otherCount:
+                self.logOtherWeights[frontierMines] = (
+                    math.lgamma(otherCount + 1) - 
+                    math.lgamma(otherMines + 1) - 
+                    math.lgamma(otherCount - otherMines + 1))
+
+    def sampleBatch(self, batchSize, deadline=None):
+        """
+        This method draws a batch of layouts at once.
+        Returns a (cells x batchSize) boolean array of the layouts and the
+        log weight of every layout (-inf for layouts that broke a
+        constraint), or None if the optional time.perf_counter() deadline
+        passed first.
+        """
+        layouts = np.zeros((len(self.cells), batchSize), dtype=bool)
+        minesIn = np.zeros((len(self.counts), batchSize), dtype=np.int32)
+        unassigned = self.sizes.copy()
+        logChance = np.zeros(batchSize)
+        broken = np.zeros(batchSize, dtype=bool)
+        guesses = self.rng.random((len(self.cells), batchSize))
+        for depth, position in enumerate(self.order):
+            if (deadline != None and depth % 64 == 0 and 
+                time.perf_counter() > deadline):
+                return None
+            indices = self.cellConstraints[position]
+            # mines still needed by each constraint of the cell
+            needed = self.counts[indices, None] - minesIn[indices]
+            mustBeMine = np.any(needed == unassigned[indices, None], axis=0)
+            mustBeSafe = np.any(needed == 0, axis=0)
+            broken |= mustBeMine & mustBeSafe
+            free = ~(mustBeMine | mustBeSafe)
+            # guess with the share of mines its constraints still need
+            chance = (needed / unassigned[indices, None]).mean(axis=0)
+            chance = np.clip(chance, 0.05, 0.95)
+            guess = guesses[depth] < chance
+            values = mustBeMine | (free & guess)
+            logChance += np.where(free, np.log(np.where(guess, chance, 
+                                                        1 - chance)), 0)
+            layouts[position] = values
+            minesIn[indices] += values
+            unassigned[indices] -= 1
+        frontierMines = layouts.sum(axis=0)
+        logWeights = self.logOtherWeights[frontierMines] - logChance
+        logWeights[broken] = -np.inf
+        return layouts, logWeights
+
+def getWilsonBounds(estimate, sampleSize, z=1.96):
+    """
+    This function returns the lower and upper confidence bounds of a 
+    chance estimated from a number of samples.
+    Uses the Wilson score interval, which stays sensible near 0 and 1.
+    """
+    if sampleSize <= 0:
+        return 0.0, 1.0
+    denominator = 1 + z * z / sampleSize
+    center = (estimate + z * z / (2 * sampleSize)) / denominator
+    spread = z * math.sqrt(estimate * (1 - estimate) / sampleSize + 
+                           z * z / (4 * sampleSize * sampleSize)) / denominator
+    return max(0.0, center - spread), min(1.0, center + spread)
+
+def sampleMineProbabilities(components, unknownCount, minesLeft, sampleBudget,
+                            batchSize=1000, deadline=None, rng=None,
+                            firstBatchSize=50):
+    """
+    This function estimates the chance that each unknown cell is a mine by
+    sampling mine layouts that agree with the components of the knowledge
+    base, up to sampleBudget layouts or until the
+    optional time.perf_counter() deadline passes (batches are sized to fit
+    the time left, and the one the deadline cuts short is dropped).
+    Returns a dict of (estimate, lower bound, upper bound) for every
+    frontier cell, and the same tuple for the other unknown cells (None
+    if there are none), or None if no valid layout was drawn.
+    """
+    # put every component in one numbering, since the number of mines
+    # left ties them together
+    cells = []
+    constraints = []
+    for componentCells, componentConstraints in components:
+        offset = len(cells)
+        cells.extend(componentCells)
+        for positions, count in componentConstraints:
+            constraints.append(([offset + position for position in positions],
+                                count))
+    otherCount = unknownCount - len(cells)
+    sampler = LayoutSampler(cells, constraints, otherCount, minesLeft, rng)
+    # weighted sums, scaled by exp(-scale) to avoid overflow
+    scale = None
+    totalWeight = 0.0
+    totalSquaredWeight = 0.0
+    cellWeights = np.zeros(len(cells))
+    otherMines = 0.0
+    samples = 0
+    size = min(firstBatchSize, batchSize, sampleBudget)
+    while size > 0:
+        start = time.perf_counter()
+        batch = sampler.sampleBatch(size, deadline)
+        if batch == None:
+            break
+        layouts, logWeights = batch
+        samples += size
+        sampleTime = (time.perf_counter() - start) / size
+        largest = logWeights.max()
+        if largest != -np.inf:
+            if scale == None or largest > scale:
+                # rescale the sums so far to the new largest weight
+                if scale != None:
+                    factor = math.exp(scale - largest)
+                    totalWeight *= factor
+                    totalSquaredWeight *= factor * factor
+                    cellWeights *= factor
+                    otherMines *= factor
+                scale = largest
+            weights = np.exp(logWeights - scale)
+            totalWeight += weights.sum()
+            totalSquaredWeight += (weights * weights).sum()
+            cellWeights += layouts @ weights
+            otherMines += ((minesLeft - layouts.sum(axis=0)) * weights).sum()
+        size = min(batchSize, sampleBudget - samples)
+        if deadline != None:
+            # only as many samples as the time left allows
+            timeLeft = deadline - time.perf_counter()
+            size = min(size, int(timeLeft / max(sampleTime, 1e-9)))
+    if totalWeight == 0:
+        return None
+    # effective number of samples, given how uneven the weights are
+    effectiveSize = totalWeight * totalWeight / totalSquaredWeight
+    probabilities = dict()
+    for position, cell in enumerate(cells):
+        estimate = float(cellWeights[position] / totalWeight)
+        probabilities[cell] = ((estimate,) + 
+                               getWilsonBounds(estimate, effectiveSize))
+    otherProbability = None
+    if otherCount > 0:
+        estimate = otherMines / totalWeight / otherCount
+        otherProbability = ((estimate,) + 
+                            getWilsonBounds(estimate, effectiveSize))
+    return probabilities, otherProbability
+
+def getGuessChances(components, unknownCount, minesLeft, sampleBudget,
+                    deadline=None):
+    """
+    This function finds the chance that each unknown cell is a mine,
+    exactly if every component can be solved before the deadline, and
+    otherwise by sampling layouts.
+    Only reads its arguments, so it can run on another thread while the
+    AI keeps changing.
+    Returns (chance of every frontier cell, chance of the other unknown
+    cells, True if the chances are exact), or None if no chances were
+    found in time.
+    """
+    result = getMineProbabilities(components, unknownCount, minesLeft,
+                                  deadline)
+    if result != None:
+        return result[0], result[1], True
+    if deadline != None and time.perf_counter() > deadline:
+        return None
+    result = sampleMineProbabilities(components, unknownCount, minesLeft,
+                                     sampleBudget, deadline=deadline)
+    if result == None:
+        return None
+    # keep only the estimates, without their bounds
+    estimates, otherEstimate = result
+    return ({cell: estimate[0] for cell, estimate in estimates.items()},
+            None if otherEstimate == None else otherEstimate[0], False)